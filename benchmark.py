@@ -0,0 +1,373 @@
+"""Reproducible performance benchmark for pdf2pptx_converter.
+
+Generates a deterministic synthetic PDF corpus (no downloads), converts every
+document at several DPI settings and reports pages/s, per-stage latency
+percentiles and peak memory. Results can be saved as a baseline and later runs
+compared against it with regression thresholds (exit code 1 on regression).
+A baseline recorded on another machine, with other library versions or other
+settings is refused (exit code 2) unless --allow-mismatch is given.
+
+Runs on CPU only and never touches the network: the OCR models ship with
+rapidocr_onnxruntime, and the LaMa model must already be on disk
+($LAMA_MODEL / torch hub cache for the torch backend, or an ONNX export via
+--onnx-model / $LAMA_ONNX_MODEL).
+
+Examples:
+    python benchmark.py --quick
+    python benchmark.py --dpi 100 150 --save-baseline bench_baseline.json
+    python benchmark.py --dpi 100 150 --baseline bench_baseline.json
+"""
+import os
+# CPU-only: hide GPUs before torch / onnxruntime are imported anywhere
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import platform
+import tempfile
+import multiprocessing
+
+import numpy as np
+import cv2
+
+import pdf2pptx_converter as converter
+
+BENCH_SEED = 1234
+DEFAULT_DPIS = [72, 100, 150]
+DEFAULT_MAX_SLOWDOWN = 0.10       # Allowed drop in pages/s and growth in stage p95 vs the baseline
+DEFAULT_MAX_MEMORY_GROWTH = 0.15  # Allowed growth in peak RSS vs the baseline
+MIN_STAGE_SECONDS = 0.005         # Stages faster than this in the baseline are too noisy to gate on
+EXIT_BASELINE_MISMATCH = 2
+# Stages reported per case; pages above --max-megapixels are rendered, OCR'd and inpainted in 'tiled'
+STAGES = ('render', 'tiled', 'ocr', 'inpaint', 'encode', 'write')
+# Distributions whose versions are recorded with the results; a baseline only compares on the same ones
+TRACKED_PACKAGES = ('onnxruntime', 'rapidocr_onnxruntime', 'torch', 'numpy', 'pypdfium2', 'pdfplumber', 'Pillow')
+
+WORDS = ("revenue growth quarter market customer product strategy pipeline margin forecast "
+         "operations regional platform launch segment target budget review summary outlook").split()
+
+# name: (pages, quick pages, page width pt, page height pt)
+CORPORA = {
+    'text': (6, 2, 720, 405),        # Dense born-digital text slides
+    'images': (6, 2, 720, 405),      # Photos/illustrations with captions
+    'scanned': (6, 2, 720, 405),     # Full-page raster with text burnt in, no text layer
+    'large': (2, 1, 2384, 1684),     # A1 landscape poster
+    'poster': (1, 1, 4000, 2826),    # The A1 layout scaled up: ~49 MP at 150 dpi, above the tiling cap
+    'many': (60, 10, 720, 405),      # Long deck of simple slides
+}
+
+
+# --- Synthetic PDF corpus ---
+class PdfBuilder:
+    """Minimal PDF writer: Helvetica text, filled rects and RGB images, nothing else"""
+    def __init__(self):
+        self.objects = []
+        self.pages = []
+        self.font = self.add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    def add(self, body):
+        self.objects.append(body)
+        return len(self.objects)
+
+    def image(self, pixels, jpeg=False):
+        """Add an RGB uint8 HxWx3 array as an image XObject, returns its object id"""
+        height, width = pixels.shape[:2]
+        if jpeg:
+            ok, data = cv2.imencode(".jpg", cv2.cvtColor(pixels, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, 85])
+            data, filt = data.tobytes(), b"/DCTDecode"
+        else:
+            data, filt = zlib.compress(np.ascontiguousarray(pixels).tobytes(), 6), b"/FlateDecode"
+        header = (b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+                  b"/BitsPerComponent 8 /Filter %s /Length %d >>" % (width, height, filt, len(data)))
+        return self.add(header + b"\nstream\n" + data + b"\nendstream")
+
+    def page(self, width, height, content, images=()):
+        xobjects = b" ".join(b"/Im%d %d 0 R" % (n, obj) for n, obj in enumerate(images))
+        stream = self.add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        self.pages.append((width, height, stream, xobjects))
+
+    def save(self, path):
+        pages_id = len(self.objects) + len(self.pages) + 1
+        kids = []
+        for width, height, stream, xobjects in self.pages:
+            kids.append(self.add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                                 b"/Resources << /Font << /F1 %d 0 R >> /XObject << %s >> >> >>"
+                                 % (pages_id, width, height, stream, self.font, xobjects)))
+        assert self.add(b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) +
+                        b"] /Count %d >>" % len(kids)) == pages_id
+        catalog = self.add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+        out = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for n, body in enumerate(self.objects, 1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n" % n + body + b"\nendobj\n"
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(self.objects) + 1)
+        out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+        out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(self.objects) + 1, catalog, xref)
+        with open(path, "wb") as f:
+            f.write(out)
+
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def text_op(x, y, size, text, gray=0.0):
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"BT /F1 %d Tf %.2f g %d %d Td (%s) Tj ET\n" % (size, gray, x, y, text.encode("latin-1"))
+
+
+def photo(rng, width, height):
+    """Smooth color field with some noise, a stand-in for a photo"""
+    np_rng = np.random.default_rng(rng.randrange(2 ** 32))
+    coarse = np_rng.integers(0, 255, (max(2, height // 32), max(2, width // 32), 3), dtype=np.uint8)
+    img = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = np_rng.normal(0, 6, img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def build_corpus(name, path, quick=False):
+    pages, quick_pages, width, height = CORPORA[name]
+    rng = random.Random(f"{BENCH_SEED}-{name}")
+    pdf = PdfBuilder()
+    for n in range(quick_pages if quick else pages):
+        content = b"0.96 0.96 0.98 rg 0 0 %d %d re f\n" % (width, height)
+        images = []
+        if name == 'text':
+            content += text_op(40, height - 50, 26, f"{sentence(rng, 4)} {n + 1}")
+            for line in range(22):
+                content += text_op(40, height - 85 - line * 14, 10, sentence(rng, 12), 0.2)
+        elif name == 'images':
+            for k in range(4):
+                images.append(pdf.image(photo(rng, 320, 200)))
+                x, y = 30 + (k % 2) * 350, 30 + (k // 2) * 180
+                content += b"q 320 0 0 150 %d %d cm /Im%d Do Q\n" % (x, y, k)
+                content += text_op(x, y + 155, 11, sentence(rng, 5))
+        elif name == 'scanned':
+            scale = 150 / 72
+            raster = np.full((int(height * scale), int(width * scale), 3), 245, dtype=np.uint8)
+            cv2.putText(raster, sentence(rng, 3), (60, 90), cv2.FONT_HERSHEY_SIMPLEX, 2.0, (30, 30, 90), 4)
+            for line in range(14):
+                cv2.putText(raster, sentence(rng, 8), (60, 160 + line * 50), cv2.FONT_HERSHEY_SIMPLEX,
+                            0.9, (40, 40, 40), 2)
+            np_rng = np.random.default_rng(rng.randrange(2 ** 32))
+            raster = np.clip(raster + np_rng.normal(0, 4, raster.shape), 0, 255).astype(np.uint8)
+            images.append(pdf.image(raster, jpeg=True))
+            content = b"q %d 0 0 %d 0 0 cm /Im0 Do Q\n" % (width, height)
+        elif name in ('large', 'poster'):
+            # The poster is the A1 layout, scaled up to near the 56 inch PowerPoint slide limit
+            base_width, top = CORPORA['large'][2:]
+            zoom = width / base_width
+            if name == 'poster':
+                content += b"q %.4f 0 0 %.4f 0 0 cm\n" % (zoom, zoom)
+            content += b"0.2 0.3 0.6 rg 0 %d %d 200 re f\n" % (top - 200, base_width)
+            content += text_op(80, top - 130, 90, sentence(rng, 4), 1.0)
+            for col in range(3):
+                x = 80 + col * 760
+                images.append(pdf.image(photo(rng, 640, 400)))
+                content += b"q 700 0 0 440 %d 700 cm /Im%d Do Q\n" % (x, col)
+                for line in range(30):
+                    content += text_op(x, 640 - line * 20, 14, sentence(rng, 9), 0.15)
+            if name == 'poster':
+                content += b"Q\n"
+        else:  # many
+            content += b"0.85 0.9 0.95 rg 40 40 %d 120 re f\n" % (width - 80)
+            content += text_op(40, height - 60, 28, f"{sentence(rng, 3)} {n + 1}")
+            for line in range(5):
+                content += text_op(60, height - 110 - line * 24, 16, "- " + sentence(rng, 7), 0.2)
+        pdf.page(width, height, content, images)
+    pdf.save(path)
+    return path
+
+
+# --- Runner ---
+def run_case(pdf_path, dpi, dilation, options):
+    """Convert one document with fresh models and return its metrics summary (runs in a worker process)"""
+    summaries = []
+    logic = converter.ConverterLogic(log_callback=lambda msg: None, metrics_hook=summaries.append, **options)
+    start = time.perf_counter()
+    if not logic.initialize_models():
+        return {'error': 'model initialization failed'}
+    init_s = time.perf_counter() - start
+    out_dir = tempfile.mkdtemp(prefix="pdf2pptx-bench-")
+    pptx_path = os.path.join(out_dir, "out.pptx")
+    ok = logic.convert(pdf_path, pptx_path, dpi, dilation)
+    summary = summaries[0] if summaries else {}
+    summary.pop('page_details', None)
+    summary['ok'] = ok
+    summary['init_s'] = round(init_s, 3)
+    summary['pptx_bytes'] = os.path.getsize(pptx_path) if ok else None
+    try:
+        os.remove(pptx_path)
+        os.rmdir(out_dir)
+    except OSError:
+        pass
+    return summary
+
+
+def run_isolated(pdf_path, dpi, dilation, options):
+    """Run a case in its own process so peak RSS belongs to that case alone"""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_case, (pdf_path, dpi, dilation, options))
+
+
+def case_row(key, summary):
+    stages = summary.get('stages', {})
+    cells = [f"{key:<14}", f"{summary.get('pages', 0):>5}", f"{summary.get('pages_per_s') or 0:>8.2f}",
+             f"{summary.get('peak_rss_mb') or 0:>8.0f}"]
+    for stage in STAGES:
+        s = stages.get(stage)
+        cells.append(f"{s['p50_s'] * 1000:>7.0f}/{s['p95_s'] * 1000:<6.0f}" if s else f"{'-':>14}")
+    return " ".join(cells)
+
+
+def machine_info():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count()
+    return {'platform': platform.platform(), 'processor': platform.processor() or platform.machine(),
+            'python': platform.python_version(), 'cpus': cpus}
+
+
+def package_versions():
+    from importlib.metadata import version, PackageNotFoundError
+    versions = {'opencv': cv2.__version__}
+    for name in TRACKED_PACKAGES:
+        try:
+            versions[name] = version(name)
+        except PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def baseline_mismatches(results, baseline):
+    """Differences in machine, library versions and settings that make a comparison meaningless"""
+    mismatches = []
+    for section in ('machine', 'versions', 'settings'):
+        base, cur = baseline.get(section) or {}, results.get(section) or {}
+        for field in sorted(set(base) | set(cur)):
+            if base.get(field, "<missing>") != cur.get(field, "<missing>"):
+                mismatches.append(f"{section}.{field}: baseline {base.get(field, '<missing>')!r}, "
+                                  f"now {cur.get(field, '<missing>')!r}")
+    return mismatches
+
+
+def compare(results, baseline, max_slowdown, max_memory_growth):
+    """Return a list of human readable regressions of `results` against `baseline`"""
+    regressions = []
+    for key, base in baseline.get('cases', {}).items():
+        cur = results['cases'].get(key)
+        if cur is None or 'error' in base:
+            continue
+        if 'error' in cur:
+            regressions.append(f"{key}: {cur['error']}")
+            continue
+        if base.get('pages_per_s') and cur['pages_per_s'] < base['pages_per_s'] * (1 - max_slowdown):
+            regressions.append(f"{key}: pages/s {cur['pages_per_s']:.2f} < baseline {base['pages_per_s']:.2f}")
+        if base.get('peak_rss_mb') and cur.get('peak_rss_mb') and \
+                cur['peak_rss_mb'] > base['peak_rss_mb'] * (1 + max_memory_growth):
+            regressions.append(f"{key}: peak RSS {cur['peak_rss_mb']:.0f} MB > baseline {base['peak_rss_mb']:.0f} MB")
+        for stage, b in base.get('stages', {}).items():
+            c = cur.get('stages', {}).get(stage)
+            if c is None:
+                # E.g. poster pages no longer taking the tiled path: its time moved elsewhere, unchecked
+                regressions.append(f"{key}: no {stage} stage (baseline: {b['count']} pages)")
+                continue
+            if b['p95_s'] >= MIN_STAGE_SECONDS and c['p95_s'] > b['p95_s'] * (1 + max_slowdown):
+                regressions.append(f"{key}: {stage} p95 {c['p95_s'] * 1000:.0f} ms > baseline {b['p95_s'] * 1000:.0f} ms")
+    return regressions
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="Benchmark pdf2pptx on a synthetic corpus.")
+    parser.add_argument("--corpus", nargs="+", choices=list(CORPORA), default=list(CORPORA))
+    parser.add_argument("--dpi", nargs="+", type=int, default=DEFAULT_DPIS)
+    parser.add_argument("--dilation", type=int, default=15)
+    parser.add_argument("--quick", action="store_true", help="Fewer pages per document")
+    parser.add_argument("--work-dir", default=None, help="Where to write the corpus (default: temp dir)")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Do not start a fresh process per case (faster, but peak RSS accumulates)")
+    parser.add_argument("--inpaint-backend", choices=["auto", "torch", "onnx"], default="auto")
+    parser.add_argument("--onnx-model", default=None)
+    parser.add_argument("--max-megapixels", type=float, default=converter.DEFAULT_MAX_MEGAPIXELS,
+                        help="Pages above this are processed in tiles (the poster corpus crosses the default at 150 dpi)")
+    parser.add_argument("--output", "-o", default=None, help="Write results as JSON")
+    parser.add_argument("--save-baseline", default=None, help="Store these results as the baseline")
+    parser.add_argument("--baseline", default=None, help="Compare against a stored baseline")
+    parser.add_argument("--max-slowdown", type=float, default=DEFAULT_MAX_SLOWDOWN)
+    parser.add_argument("--max-memory-growth", type=float, default=DEFAULT_MAX_MEMORY_GROWTH)
+    parser.add_argument("--allow-mismatch", action="store_true",
+                        help="Compare even if the baseline comes from another machine, versions or settings")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="pdf2pptx-corpus-")
+    os.makedirs(work_dir, exist_ok=True)
+    options = {'inpaint_backend': args.inpaint_backend, 'onnx_model': args.onnx_model,
+               'max_megapixels': args.max_megapixels}
+
+    results = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'machine': machine_info(),
+        'versions': package_versions(),
+        'settings': {'quick': args.quick, 'dpis': args.dpi, 'dilation': args.dilation,
+                     'inpaint_backend': args.inpaint_backend, 'max_megapixels': args.max_megapixels,
+                     'onnx_model': os.path.basename(args.onnx_model) if args.onnx_model else None,
+                     'in_process': args.in_process},
+        'cases': {},
+    }
+    print(f"{'case':<14} {'pages':>5} {'pages/s':>8} {'rss MB':>8} "
+          + " ".join(f"{s + ' p50/p95 ms':>14}" for s in STAGES))
+    for name in args.corpus:
+        pdf_path = build_corpus(name, os.path.join(work_dir, f"{name}{'_quick' if args.quick else ''}.pdf"), args.quick)
+        for dpi in args.dpi:
+            key = f"{name}@{dpi}"
+            run = run_case if args.in_process else run_isolated
+            summary = run(pdf_path, dpi, args.dilation, options)
+            results['cases'][key] = summary
+            print(f"{key:<14} ERROR {summary['error']}" if 'error' in summary else case_row(key, summary), flush=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if any('error' in s for s in results['cases'].values()):
+        return 1
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        mismatches = baseline_mismatches(results, baseline)
+        for line in mismatches:
+            print(f"BASELINE MISMATCH {line}")
+        if mismatches and not args.allow_mismatch:
+            print(f"Not comparing against {args.baseline}: it was recorded under different conditions "
+                  f"(--allow-mismatch to compare anyway).")
+            return EXIT_BASELINE_MISMATCH
+        if mismatches:
+            print("WARNING: comparing against a baseline from different conditions, "
+                  "regressions and speedups below may be bogus.")
+        regressions = compare(results, baseline, args.max_slowdown, args.max_memory_growth)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print("No regressions against the baseline." if not regressions else f"{len(regressions)} regression(s).")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
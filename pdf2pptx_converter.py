@@ -1,124 +1,2511 @@
+import time
+import ctypes
+_STARTUP_T0 = time.perf_counter()
+
 import sys
 import os
-import pdfplumber
-import numpy as np
-import cv2
-from rapidocr_onnxruntime import RapidOCR
-from pptx import Presentation
-from pptx.util import Pt
-from simple_lama_inpainting import SimpleLama
+import importlib
+import importlib.util
 from PIL import Image
-import torch
 import gc
-import tempfile
-import shutil
 import threading
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext, ttk
+import queue
+import multiprocessing
+import hashlib
+import json
+import io
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
+import glob
+import csv
+import argparse
+import shutil
+import tempfile
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import Future
+# tkinter is only needed for the GUI; headless workers often do not have it
+try:
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, scrolledtext, ttk
+    HAS_TK = True
+except ImportError:
+    HAS_TK = False
+
+
+class LazyModule:
+    """Stand-in for a heavy module that is imported on first attribute access.
+
+    torch, cv2, onnxruntime (via RapidOCR) and friends take seconds to import;
+    deferring them lets the GUI come up immediately and keeps `--help` instant.
+    """
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+np = LazyModule('numpy')
+cv2 = LazyModule('cv2')
+torch = LazyModule('torch')
+pdfplumber = LazyModule('pdfplumber')
+# pypdfium2 ships with pdfplumber>=0.10 and is needed for text-stripped backgrounds
+pdfium = LazyModule('pypdfium2')
+pdfium_c = LazyModule('pypdfium2.raw')
+HAS_PDFIUM = importlib.util.find_spec('pypdfium2') is not None
+# torch is only needed by the TorchScript LaMa backend; ONNX-only installs can skip it
+HAS_TORCH = importlib.util.find_spec('torch') is not None
+
+
+def emu(points):
+    """Points to the EMU integers used in OOXML (same as pptx.util.Pt)"""
+    return int(points * 12700)
+
+# --- Global Config ---
+DEFAULT_DPI = 250
+DEFAULT_ROI_PADDING = 64          # Context pixels kept around each masked region for LaMa
+DEFAULT_ROI_FULL_PAGE_RATIO = 0.6 # Above this ROI/page area ratio, inpaint the page in one pass
+PIPELINE_QUEUE_SIZE = 2           # Pages buffered between two pipeline stages
+PAGE_BUFFER_POOL_KEEP = 6         # Free page rasters kept for reuse by the next pages
+REBALANCE_PAGES = 4               # Pages between two comparisons of the OCR and inpainting latencies
+REBALANCE_RATIO = 1.3             # Slower/faster stage latency above which a core moves to the slower stage
+DEFAULT_OCR_DPI = 150             # Text detection resolution; pages rendered above it are downscaled for OCR
+OCR_SMALL_TEXT_PX = 24            # Lines shorter than this in the detection image are re-read from full-res crops
+TEMPLATE_TILE_PX = 128            # Tile size used to find regions repeated across pages
+TEMPLATE_MIN_SHARED = 0.2         # Min share of identical tiles for a page to reuse a reference page
+TEMPLATE_NEW_REF_RATIO = 0.9      # Pages sharing less than this with their reference become references
+TEMPLATE_MAX_REFERENCES = 4       # Reference pages (distinct layouts) kept per document
+MASK_KERNEL_STEP = 5              # Per-line dilation kernels are rounded up to multiples of this
+MASK_DILATION_RATIO = 0.2         # Dilation kernel per pixel of line height, at the reference strength
+MASK_REFERENCE_DILATION = 15      # --dilation value at which the ratio applies as is (it scales linearly)
+MASK_MIN_KERNEL_PX = 3            # Smallest per-line dilation kernel (footnotes, subscripts)
+MASK_MAX_KERNEL_PX = 40           # Largest per-line dilation kernel (titles)
+DEFAULT_MAX_MEGAPIXELS = 40       # Pages rendering larger than this are processed in tiles (0 = never)
+TILE_PX = 2048                    # Max tile side (pixels) for tiled pages
+TILE_OVERLAP_PX = 128             # Context shared by neighbouring tiles, blended across the seam
+SHARDS_PER_PAGE_WORKER = 2        # Page ranges per worker process when one PDF is split across processes
+SERVICE_QUEUE_SIZE = 16           # Jobs waiting for a worker before the service refuses new ones (503)
+SERVICE_MAX_UPLOAD_MB = 256       # Largest PDF the service accepts
+SERVICE_RESULT_TTL_S = 3600       # Finished service jobs and their files are dropped after this long
+SERVICE_DPI_RANGE = (72, 300)     # dpi a service job may ask for (the GUI's range)
+SERVICE_DILATION_RANGE = (0, 50)  # Cleaner strength a service job may ask for (the GUI's range)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdf2pptx", "pages")
+DEFAULT_CACHE_SIZE_MB = 2048
+NATIVE_TEXT_MAX_GARBLED = 0.1     # Max share of unmappable (cid:..) glyphs for a usable text layer
+NATIVE_OCR_MIN_REGION_PX = 32     # Embedded images smaller than this (pixels) are not OCR'd
+STRIP_DIFF_THRESHOLD = 24         # Per-channel difference that counts as "text was removed here"
+STRIP_MIN_CHANGED_RATIO = 0.01    # Mask regions with fewer changed pixels still need inpainting
+DEFAULT_IMAGE_FORMAT = 'jpeg'     # Slide background codec: 'jpeg', 'webp' or 'png'
+DEFAULT_IMAGE_QUALITY = 92        # JPEG/WebP quality (1-100)
+DEFAULT_PNG_COMPRESS_LEVEL = 6    # PNG zlib level (0-9)
+GUI_IMAGE_FORMAT = 'png'          # The GUI keeps lossless backgrounds unless the user picks JPEG/WebP
+DEFAULT_ONNX_MODEL = os.path.join(os.path.expanduser("~"), ".cache", "pdf2pptx", "big-lama.onnx")
+PARITY_MIN_PSNR = 30.0            # Min masked-region PSNR (dB) for two inpainting backends to agree
+PARITY_MIN_SSIM = 0.9             # Min masked-region SSIM for a reduced-precision mode to pass
+INPAINT_PRECISIONS = ('fp32', 'frozen', 'bf16', 'int8')
+# Synthetic reference set ((width, height), seed) the precision modes are checked against fp32 on
+PRECISION_REFERENCE_SET = (((512, 384), 0), ((384, 512), 1), ((768, 256), 2), ((256, 256), 3))
+LAMA_BATCH_WAIT_MS = 200         # Longest a queued LaMa crop waits for its batch to fill
+LAMA_BATCH_MAX_MEGAPIXELS = 16    # A batch also runs once its padded crops add up to this much
+LAMA_BUCKET_PX = 64               # Batched crops are padded up to multiples of this (itself a multiple of 8)
+REGION_RING_PX = 6                # Width of the background ring sampled around each masked region
+REGION_MIN_RING_PIXELS = 24       # Fewer ring samples than this: not enough evidence, use LaMa
+REGION_FLAT_MAX_STD = 6.0         # Ring color std (after a plane fit for gradients) for a plain fill
+REGION_CLASSIC_MAX_TEXTURE = 10.0 # Mean ring gradient magnitude up to which cv2.inpaint is used
+REGION_CLASSIC_MAX_STD = 40.0     # ...as long as the ring colors do not vary more than this
+REGION_CLASSIC_METHOD = 'telea'   # cv2.inpaint algorithm for low-texture regions: 'telea' or 'ns'
+REGION_SOLVERS = ('solid', 'gradient', 'classical', 'lama')
+
+
+def merge_boxes(boxes):
+    """Merge overlapping (x0, y0, x1, y1) boxes until no two boxes intersect"""
+    boxes = [list(b) for b in boxes]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        while boxes:
+            cur = boxes.pop()
+            i = 0
+            while i < len(boxes):
+                b = boxes[i]
+                if b[0] < cur[2] and cur[0] < b[2] and b[1] < cur[3] and cur[1] < b[3]:
+                    cur = [min(cur[0], b[0]), min(cur[1], b[1]), max(cur[2], b[2]), max(cur[3], b[3])]
+                    boxes.pop(i)
+                    merged = True
+                else:
+                    i += 1
+            result.append(cur)
+        boxes = result
+    return boxes
+
+
+def tile_spans(length, tile=TILE_PX, overlap=TILE_OVERLAP_PX):
+    """Split [0, length) into near-equal tiles of at most `tile` pixels.
+
+    Returns (core_start, core_end, start, end) per tile: the cores partition the
+    range, start/end add up to `overlap` pixels of context on each side.
+    """
+    count = max(1, -(-length // tile))
+    bounds = [round(i * length / count) for i in range(count + 1)]
+    return [(a, b, max(0, a - overlap), min(length, b + overlap)) for a, b in zip(bounds, bounds[1:])]
+
+
+def join_overlapping_text(left, right):
+    """Join two readings of a split line, dropping the characters both tiles read"""
+    # Characters cut by the tile edge are often misread: allow one on each side to differ
+    for trim_left, trim_right in ((0, 0), (1, 0), (0, 1), (1, 1)):
+        head = left[:len(left) - trim_left]
+        tail = right[trim_right:]
+        for k in range(min(len(head), len(tail)), 1, -1):
+            if head.endswith(tail[:k]):
+                return head + tail[k:]
+    sep = ' ' if left and right and left[-1].isascii() and right[0].isascii() else ''
+    return left.rstrip() + sep + right.lstrip()
+
+
+def stitch_tile_lines(items, overlap=TILE_OVERLAP_PX):
+    """Merge OCR lines read from overlapping tiles into page-level lines.
+
+    `items` holds (box, text, score, core, extent) with boxes in page pixels and
+    the (x0, y0, x1, y1) core and extent rects of the tile that read them. A line
+    read whole by two tiles is kept once, by the tile whose core holds its center.
+    A line cut by a tile edge, vertical or horizontal, is joined with the
+    fragment read by the neighbour on the other side.
+    """
+    edge = max(4, overlap // 8)
+    lines = []
+    for box, text, score, core, extent in items:
+        poly = np.asarray(box, dtype=np.float32)
+        (x0, y0), (x1, y1) = poly.min(axis=0), poly.max(axis=0)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        if not (core[0] <= cx < core[2] and core[1] <= cy < core[3]):
+            continue
+        cut = ((extent[0] < core[0] and x0 <= extent[0] + edge) or (extent[2] > core[2] and x1 >= extent[2] - edge),
+               (extent[1] < core[1] and y0 <= extent[1] + edge) or (extent[3] > core[3] and y1 >= extent[3] - edge))
+        lines.append((float(x0), float(y0), float(x1), float(y1), text, score, box, core, cut))
+
+    parent = list(range(len(lines)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, a in enumerate(lines):
+        for axis in (0, 1):
+            if not a[8][axis]:
+                continue
+            # Along the cut axis the fragments overlap or touch, across it they share most of their extent
+            lo, hi, other_lo, other_hi = (0, 2, 1, 3) if axis == 0 else (1, 3, 0, 2)
+            for j, b in enumerate(lines):
+                if i == j or a[7] == b[7]:
+                    continue
+                first, second = (a, b) if a[lo] <= b[lo] else (b, a)
+                if not (second[lo] <= first[hi] < second[hi]):
+                    continue
+                shared = min(first[other_hi], second[other_hi]) - max(first[other_lo], second[other_lo])
+                if shared >= 0.5 * min(first[other_hi] - first[other_lo], second[other_hi] - second[other_lo]):
+                    parent[find(i)] = find(j)
+
+    groups = {}
+    for i in range(len(lines)):
+        groups.setdefault(find(i), []).append(lines[i])
+    result = []
+    for group in groups.values():
+        if len(group) == 1:
+            result.append((group[0][6], group[0][4], group[0][5]))
+            continue
+        x0, y0 = min(line[0] for line in group), min(line[1] for line in group)
+        x1, y1 = max(line[2] for line in group), max(line[3] for line in group)
+        # Reading order follows the line: left to right, or top to bottom for vertical text
+        lo, hi = (0, 2) if x1 - x0 >= y1 - y0 else (1, 3)
+        group.sort(key=lambda line: line[lo])
+        text, best, start, end = group[0][4], group[0][5], group[0][lo], group[0][hi]
+        for line in group[1:]:
+            if min(end, line[hi]) - line[lo] > 0.8 * (max(end, line[hi]) - start):
+                # Mostly the same span read twice (a line sliced lengthwise): keep the surer reading
+                if line[5] > best:
+                    text, best = line[4], line[5]
+            else:
+                text, best = join_overlapping_text(text, line[4]), min(best, line[5])
+            end = max(end, line[hi])
+        score = min(line[5] for line in group)
+        result.append(([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, score))
+    return result
+
+
+def polygon_array(boxes):
+    """(N, 4, 2) float32 array of the quadrilaterals of OCR-style (box, text, score) items"""
+    if not boxes:
+        return np.zeros((0, 4, 2), dtype=np.float32)
+    return np.array([item[0] for item in boxes], dtype=np.float32).reshape(-1, 4, 2)
+
+
+def crop_text_box(image, poly):
+    """Perspective-crop a (possibly rotated) text quadrilateral, upright, as RapidOCR does"""
+    poly = np.asarray(poly, dtype=np.float32)
+    crop_w = int(max(np.linalg.norm(poly[0] - poly[1]), np.linalg.norm(poly[2] - poly[3])))
+    crop_h = int(max(np.linalg.norm(poly[0] - poly[3]), np.linalg.norm(poly[1] - poly[2])))
+    crop_w, crop_h = max(crop_w, 1), max(crop_h, 1)
+    target = np.array([[0, 0], [crop_w, 0], [crop_w, crop_h], [0, crop_h]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(poly, target)
+    crop = cv2.warpPerspective(image, matrix, (crop_w, crop_h), borderMode=cv2.BORDER_REPLICATE,
+                               flags=cv2.INTER_CUBIC)
+    # Vertical lines are read rotated
+    return np.rot90(crop) if crop_h / crop_w >= 1.5 else crop
+
+
+# --- Inpainting Backends ---
+class Inpainter:
+    """Common interface of the LaMa backends used by ConverterLogic.
+
+    Calling an inpainter with an RGB PIL image and an L-mode mask of the same
+    size returns the inpainted RGB image, already trimmed back to the input size.
+    """
+    name = 'base'
+    is_gpu = False
+    # Numeric mode actually in use (see INPAINT_PRECISIONS); unsupported requests fall back to fp32
+    precision = 'fp32'
+    # Modes the backend implements at all; others are refused (or, for ONNX, run as fp32)
+    precisions = ('fp32',)
+    # CPU threads granted by the ResourceManager, None = the runtime's own default
+    threads = None
+
+    def __call__(self, image, mask):
+        raise NotImplementedError
+
+    def set_threads(self, threads, rebuild=False):
+        """Use `threads` CPU threads from now on. `rebuild` allows recreating runtime sessions (between files)"""
+        self.threads = threads
+
+    def batch(self, images, masks):
+        """Inpaint N equally sized crops: NxHxWx3 uint8 images and NxHxW masks, returns NxHxWx3 uint8.
+
+        Backends without a batched forward pass run the crops one by one.
+        """
+        return np.stack([np.asarray(self(Image.fromarray(image), Image.fromarray(mask)).convert('RGB'))
+                         for image, mask in zip(images, masks)])
+
+    @property
+    def label(self):
+        return self.name if self.precision == 'fp32' else f"{self.name}-{self.precision}"
+
+    def identity(self):
+        """Short string identifying backend + weights, used in cache keys"""
+        return self.name
+
+
+def pad_to_modulo(array, mod=8):
+    """Symmetric pad of an HxW[xC] array to a multiple of `mod`, same as SimpleLama"""
+    height, width = array.shape[:2]
+    pad_h, pad_w = (-height) % mod, (-width) % mod
+    if not pad_h and not pad_w:
+        return array
+    pad = ((0, pad_h), (0, pad_w)) + ((0, 0),) * (array.ndim - 2)
+    return np.pad(array, pad, mode='symmetric')
+
+
+def file_identity(path):
+    try:
+        return f"{os.path.basename(path)}-{os.path.getsize(path)}"
+    except (OSError, TypeError):
+        return "unknown"
+
+
+def lama_identity(backend, model_path, precision):
+    """Short string identifying a LaMa backend, its weights file and precision"""
+    suffix = '' if precision == 'fp32' else f"-{precision}"
+    prefix = 'torch-big-lama' if backend == 'torch' else 'onnx-lama'
+    return f"{prefix}-{file_identity(model_path)}{suffix}"
+
+
+def cpu_supports_bf16():
+    """Whether oneDNN has native bfloat16 kernels on this CPU (AVX512-BF16 / AMX)"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+
+class TorchLamaInpainter(Inpainter):
+    """big-lama TorchScript model through simple_lama_inpainting (CUDA when available).
+
+    precision: 'fp32' as loaded; 'frozen' runs torch.jit.freeze and
+    optimize_for_inference on the module (constant folding, conv/bn fusion);
+    'bf16' runs under bfloat16 autocast, on CPUs with native bf16 support only.
+    int8 is refused: dynamic quantization does not cover the convolutions of a
+    TorchScript archive, it is left to the ONNX backend.
+    """
+    name = 'torch'
+    precisions = ('fp32', 'frozen', 'bf16')
+
+    def __init__(self, model_path=None, device=None, precision='fp32', log=print):
+        if precision not in self.precisions:
+            raise ValueError(f"{precision} inpainting is not available with the torch backend "
+                             f"(int8 needs --inpaint-backend onnx)")
+        from simple_lama_inpainting import SimpleLama
+        from simple_lama_inpainting.utils.util import prepare_img_and_mask
+        if model_path:
+            # SimpleLama reads the model location from the environment
+            os.environ['LAMA_MODEL'] = model_path
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = torch.device(device)
+        self.is_gpu = self.device.type == 'cuda'
+        self.model_path = torch_model_path()
+        self.lama = SimpleLama(device=self.device)
+        self.prepare = prepare_img_and_mask
+        self.precision = self.set_precision(precision, log)
+
+    def set_precision(self, precision, log):
+        """Prepare the module for `precision`. Returns the mode actually used"""
+        if precision == 'bf16' and not self.is_gpu and not cpu_supports_bf16():
+            log("This CPU has no native bfloat16 support, using fp32.")
+            return 'fp32'
+        if precision == 'frozen':
+            try:
+                frozen = torch.jit.freeze(self.lama.model.eval())
+                self.lama.model = torch.jit.optimize_for_inference(frozen)
+            except Exception as e:
+                log(f"Could not freeze the LaMa model, using fp32: {e}")
+                return 'fp32'
+        return precision
+
+    def use_threads(self):
+        # torch's intra-op thread count belongs to the calling thread (OpenMP), so it is
+        # applied by whichever thread runs the model: an inpaint stage, a LamaBatcher or a tiler
+        if self.threads and not self.is_gpu and torch.get_num_threads() != self.threads:
+            torch.set_num_threads(self.threads)
+
+    def __call__(self, image, mask):
+        self.use_threads()
+        if self.precision != 'bf16':
+            with torch.no_grad():
+                result = self.lama(image, mask)
+            # SimpleLama pads its input to a multiple of 8, trim back to the crop size
+            return result.crop((0, 0, image.width, image.height))
+        # SimpleLama converts the output with .numpy(), which has no bfloat16: run the module here
+        image_t, mask_t = self.prepare(image, mask, self.device)
+        with torch.inference_mode(), torch.autocast(device_type=self.device.type, dtype=torch.bfloat16):
+            out = self.lama.model(image_t, mask_t)
+        out = out[0].float().permute(1, 2, 0).cpu().numpy()
+        return Image.fromarray(np.clip(out * 255, 0, 255).astype(np.uint8)[:image.height, :image.width])
+
+    def batch(self, images, masks):
+        self.use_threads()
+        # Same preprocessing as prepare_img_and_mask, on the whole stack (already padded to a multiple of 8)
+        image_t = torch.from_numpy(images).to(self.device).permute(0, 3, 1, 2).float().div_(255)
+        mask_t = (torch.from_numpy(masks).to(self.device)[:, None] > 0) * 1
+        with torch.inference_mode(), torch.autocast(device_type=self.device.type, dtype=torch.bfloat16,
+                                                    enabled=self.precision == 'bf16'):
+            out = self.lama.model(image_t, mask_t)
+            return out.float().permute(0, 2, 3, 1).mul_(255).clamp_(0, 255).to(torch.uint8).cpu().numpy()
+
+    def identity(self):
+        return lama_identity('torch', self.model_path, self.precision)
+
+
+class OnnxLamaInpainter(Inpainter):
+    """LaMa exported to ONNX, run with ONNX Runtime (already installed for RapidOCR).
+
+    Expects the usual LaMa export signature: image [1,3,H,W] and mask [1,1,H,W]
+    as float32 in 0..1, output [1,3,H,W]. Exports with a fixed input size
+    (e.g. 512x512) are handled by resizing in and out. Outputs in either 0..1
+    or 0..255 are accepted.
+    """
+    name = 'onnx'
+    precisions = ('fp32', 'int8')
+
+    def __init__(self, model_path, intra_op_threads=0, inter_op_threads=0, use_gpu=False, precision='fp32',
+                 log=print):
+        import onnxruntime as ort
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(f"LaMa ONNX model not found: {model_path}")
+        self.model_path = model_path
+        if precision == 'int8':
+            model_path = self.quantized_model(model_path, log)
+            self.precision = 'int8' if model_path != self.model_path else 'fp32'
+        elif precision != 'fp32':
+            log(f"{precision} inpainting needs the torch backend, using fp32.")
+        self.session_model = model_path
+        self.inter_op_threads = inter_op_threads
+        self.providers = ['CPUExecutionProvider']
+        if use_gpu and 'CUDAExecutionProvider' in ort.get_available_providers():
+            self.providers.insert(0, 'CUDAExecutionProvider')
+        self.session = self.open_session(intra_op_threads)
+        self.is_gpu = self.session.get_providers()[0] == 'CUDAExecutionProvider'
+        inputs = self.session.get_inputs()
+        self.image_input, self.mask_input = inputs[0].name, inputs[1].name
+        height, width = inputs[0].shape[2:4]
+        # Symbolic dims come back as strings/None
+        self.fixed_size = (width, height) if isinstance(height, int) and isinstance(width, int) else None
+        self.dynamic_batch = not isinstance(inputs[0].shape[0], int)
+
+    def __call__(self, image, mask):
+        size = image.size
+        if self.fixed_size and size != self.fixed_size:
+            image = image.resize(self.fixed_size, Image.Resampling.BICUBIC)
+            mask = mask.resize(self.fixed_size, Image.Resampling.NEAREST)
+        img = pad_to_modulo(np.asarray(image.convert('RGB'), dtype=np.float32) / 255.0)
+        msk = pad_to_modulo((np.asarray(mask) > 0).astype(np.float32))
+        feeds = {
+            self.image_input: np.ascontiguousarray(img.transpose(2, 0, 1)[None]),
+            self.mask_input: msk[None, None],
+        }
+        out = self.session.run(None, feeds)[0][0].transpose(1, 2, 0)
+        if out.max() <= 1.5:
+            out = out * 255
+        out = np.clip(out, 0, 255).astype(np.uint8)[:image.height, :image.width]
+        result = Image.fromarray(out)
+        if result.size != size:
+            result = result.resize(size, Image.Resampling.BICUBIC)
+        return result
+
+    def open_session(self, intra_op_threads):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        # 0 lets ONNX Runtime pick (physical cores for intra-op, 1 for inter-op)
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.threads = intra_op_threads or None
+        return ort.InferenceSession(self.session_model, sess_options=options, providers=self.providers)
+
+    def set_threads(self, threads, rebuild=False):
+        # A session's thread pool is fixed when it is created: resize by reopening it, between files only
+        if rebuild and threads != self.threads and not self.is_gpu:
+            self.session = self.open_session(threads)
+
+    def batch(self, images, masks):
+        if self.fixed_size or not self.dynamic_batch:
+            return super().batch(images, masks)
+        feeds = {
+            self.image_input: np.ascontiguousarray(images.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0,
+            self.mask_input: (masks[:, None] > 0).astype(np.float32),
+        }
+        out = self.session.run(None, feeds)[0].transpose(0, 2, 3, 1)
+        if out.max() <= 1.5:
+            out = out * 255
+        return np.clip(out, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def quantized_model(model_path, log=print):
+        """Dynamic int8 weight quantization of an ONNX model, cached next to it (or in the cache dir).
+
+        Returns the quantized model path, or model_path itself if quantization fails.
+        """
+        stem = os.path.splitext(os.path.basename(model_path))[0]
+        for folder in (os.path.dirname(os.path.abspath(model_path)), os.path.dirname(DEFAULT_ONNX_MODEL)):
+            quantized = os.path.join(folder, f"{stem}.int8.onnx")
+            if os.path.exists(quantized) and os.path.getmtime(quantized) >= os.path.getmtime(model_path):
+                return quantized
+        try:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+        except ImportError as e:
+            log(f"onnxruntime quantization tools unavailable, using fp32: {e}")
+            return model_path
+        for folder in (os.path.dirname(os.path.abspath(model_path)), os.path.dirname(DEFAULT_ONNX_MODEL)):
+            quantized = os.path.join(folder, f"{stem}.int8.onnx")
+            try:
+                os.makedirs(folder, exist_ok=True)
+                log(f"Quantizing {os.path.basename(model_path)} to int8 (one-time)...")
+                quantize_dynamic(model_path, quantized, weight_type=QuantType.QInt8)
+                return quantized
+            except Exception as e:
+                log(f"int8 quantization into {folder} failed: {e}")
+        return model_path
+
+    def identity(self):
+        return lama_identity('onnx', self.model_path, self.precision)
+
+
+def create_inpainter(backend='auto', onnx_model=None, intra_op_threads=0, inter_op_threads=0, log=print,
+                     precision='fp32'):
+    """Build the requested inpainting backend.
+
+    'auto' prefers ONNX Runtime on CPU-only machines when an ONNX model is
+    available (or torch is not installed at all), and the torch model otherwise.
+    """
+    backend, onnx_model = resolve_inpaint_backend(backend, onnx_model)
+    if backend == 'onnx':
+        log(f"Using ONNX Runtime LaMa ({os.path.basename(onnx_model)})")
+        return OnnxLamaInpainter(onnx_model, intra_op_threads, inter_op_threads,
+                                 use_gpu=HAS_TORCH and torch.cuda.is_available(), precision=precision, log=log)
+    if not HAS_TORCH:
+        raise RuntimeError("torch is not installed; use the ONNX inpainting backend")
+    return TorchLamaInpainter(precision=precision, log=log)
+
+
+def resolve_inpaint_backend(backend='auto', onnx_model=None):
+    """The backend ('torch' or 'onnx') create_inpainter picks, and the ONNX model path"""
+    onnx_model = onnx_model or default_onnx_model_path()
+    if backend == 'auto':
+        has_cuda = HAS_TORCH and torch.cuda.is_available()
+        backend = 'onnx' if (not HAS_TORCH or not has_cuda) and os.path.exists(onnx_model) else 'torch'
+    return backend, onnx_model
+
+
+def torch_model_path():
+    """Where SimpleLama loads the TorchScript weights from"""
+    if os.environ.get('LAMA_MODEL'):
+        return os.environ['LAMA_MODEL']
+    if getattr(sys, 'frozen', False):
+        return os.path.join(sys._MEIPASS, 'big-lama.pt')
+    return os.path.join(torch.hub.get_dir(), 'checkpoints', 'big-lama.pt') if HAS_TORCH else None
+
+
+def default_onnx_model_path():
+    if os.environ.get('LAMA_ONNX_MODEL'):
+        return os.environ['LAMA_ONNX_MODEL']
+    if getattr(sys, 'frozen', False):
+        return os.path.join(sys._MEIPASS, 'big-lama.onnx')
+    return DEFAULT_ONNX_MODEL
+
+
+class LamaBatcher:
+    """Groups the LaMa crops of several pages into batched forward passes.
+
+    submit() pads a crop (symmetrically, like SimpleLama) up to a multiple of
+    LAMA_BUCKET_PX and queues it with the crops of the same padded size. A
+    bucket runs as one inpainter.batch() call on the scheduler thread when it
+    holds batch_size crops or LAMA_BATCH_MAX_MEGAPIXELS, or once its oldest
+    crop has waited max_wait_ms. Results are futures of PIL images trimmed
+    back to the crop size.
+    """
+    def __init__(self, inpainter, batch_size, max_wait_ms=LAMA_BATCH_WAIT_MS):
+        self.inpainter = inpainter
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000
+        # Padded (height, width) -> [(queued at, image, mask, crop size, future)], oldest first
+        self.buckets = {}
+        self.flushed_at = 0.0
+        self.closed = False
+        self.batches = 0
+        self.items = 0
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, image, mask):
+        image_np = pad_to_modulo(np.asarray(image.convert('RGB')), LAMA_BUCKET_PX)
+        mask_np = pad_to_modulo(np.asarray(mask), LAMA_BUCKET_PX)
+        future = Future()
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("LaMa batcher is closed")
+            bucket = self.buckets.setdefault(image_np.shape[:2], [])
+            bucket.append((time.monotonic(), image_np, mask_np, image.size, future))
+            self.cond.notify()
+        return future
+
+    def flush(self):
+        """Run everything queued so far without waiting for the batches to fill"""
+        with self.cond:
+            self.flushed_at = time.monotonic()
+            self.cond.notify()
+
+    def close(self, discard=False):
+        """Stop the scheduler thread, after running (or with discard, cancelling) what is queued"""
+        with self.cond:
+            self.closed = True
+            if discard:
+                for bucket in self.buckets.values():
+                    for item in bucket:
+                        item[4].cancel()
+                self.buckets.clear()
+            self.cond.notify()
+        self.thread.join()
+
+    def take_batch(self, now):
+        """Pop the next batch that is full or due, None if none is. Called with the lock held"""
+        for key, bucket in self.buckets.items():
+            height, width = key
+            fit = max(1, int(LAMA_BATCH_MAX_MEGAPIXELS * 1e6 // (height * width)))
+            size = min(self.batch_size, fit)
+            queued_at = bucket[0][0]
+            if (len(bucket) >= size or self.closed or queued_at <= self.flushed_at
+                    or now - queued_at >= self.max_wait):
+                batch, self.buckets[key] = bucket[:size], bucket[size:]
+                if not self.buckets[key]:
+                    del self.buckets[key]
+                return batch
+        return None
+
+    def run(self):
+        while True:
+            with self.cond:
+                while True:
+                    now = time.monotonic()
+                    batch = self.take_batch(now)
+                    if batch is not None or (self.closed and not self.buckets):
+                        break
+                    oldest = min((bucket[0][0] for bucket in self.buckets.values()), default=None)
+                    self.cond.wait(None if oldest is None else max(0.0, oldest + self.max_wait - now))
+            if batch is None:
+                return
+            self.run_batch(batch)
+
+    def run_batch(self, batch):
+        try:
+            out = self.inpainter.batch(np.stack([item[1] for item in batch]), np.stack([item[2] for item in batch]))
+        except Exception as e:
+            for item in batch:
+                item[4].set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(batch)
+        for (_queued, _image, _mask, (width, height), future), result in zip(batch, out):
+            future.set_result(Image.fromarray(np.ascontiguousarray(result[:height, :width])))
+
+
+class PendingInpaint:
+    """Page raster whose LaMa crops are still queued in a LamaBatcher"""
+    def __init__(self, image, crops):
+        self.image = image
+        # (x0, y0, boolean crop mask, future of the inpainted crop)
+        self.crops = crops
+
+    def result(self):
+        """Wait for the crops and copy their masked pixels into the page, in place"""
+        for x0, y0, crop_mask, future in self.crops:
+            crop = self.image[y0:y0 + crop_mask.shape[0], x0:x0 + crop_mask.shape[1]]
+            np.copyto(crop, np.asarray(future.result()), where=crop_mask[:, :, None])
+        self.crops = []
+        return self.image
+
+
+class BufferPool:
+    """Free list of page-sized uint8 arrays, reused from one page to the next.
+
+    Pages are rendered straight into these (see ConverterLogic.render_page)
+    and cleaned in place, so once the pool is warm a page costs no new
+    full-resolution allocations until its background is encoded.
+    """
+    def __init__(self, keep=PAGE_BUFFER_POOL_KEEP):
+        self.keep = keep
+        self.free = []
+        self.lock = threading.Lock()
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self, shape):
+        with self.lock:
+            for n, array in enumerate(self.free):
+                if array.shape == shape:
+                    self.reused += 1
+                    return self.free.pop(n)
+            self.allocated += 1
+        return np.empty(shape, dtype=np.uint8)
+
+    def release(self, array):
+        with self.lock:
+            self.free.append(array)
+            if len(self.free) > self.keep:
+                # Oldest first: it is the least likely to match the coming pages
+                self.free.pop(0)
+
+
+def available_cores():
+    """Ids of the CPUs this process may run on"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def worker_cpu_sets(workers, cores=None):
+    """Split the process' CPUs (the first `cores` of them) into one contiguous set per worker.
+
+    With fewer CPUs than workers each worker gets a single CPU, shared round
+    robin. cores=0 splits every CPU, cores=None (core management off) gives no
+    sets (None) at all.
+    """
+    if cores is None:
+        return [None] * workers
+    cpus = available_cores()[:cores or None]
+    if len(cpus) < workers:
+        return [[cpus[k % len(cpus)]] for k in range(workers)]
+    bounds = [round(k * len(cpus) / workers) for k in range(workers + 1)]
+    return [cpus[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def format_cpu_set(cpus):
+    """Compact CPU list for logs, e.g. '0-3,8'"""
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(f"{a}-{b}" if a != b else f"{a}" for a, b in ranges)
+
+
+class ResourceManager:
+    """Core budget of one converter, split between its OCR and inpainting threads.
+
+    The budget is the CPU set of the process, after pinning it to `cpu_set`
+    (its share of the machine when several workers run side by side), or
+    `cores` CPUs (0 = all of them). OCR gets RapidOCR's onnxruntime intra-op threads and the
+    OpenCV pool, inpainting gets torch's intra-op threads or the ONNX LaMa
+    session. observe() collects per-page stage latencies; every REBALANCE_PAGES
+    pages a core moves from the faster stage to the slower one when they
+    differ by more than REBALANCE_RATIO. The new split is only recorded there:
+    the converter applies it between pages (see take_pending).
+    """
+    def __init__(self, cores=None, cpu_set=None, log=print):
+        if cpu_set and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, cpu_set)
+            except OSError as e:
+                log(f"Could not pin to CPUs {format_cpu_set(cpu_set)}: {e}")
+        self.cpus = available_cores()
+        self.total = len(self.cpus) if cpu_set else max(1, min(cores or len(self.cpus), len(self.cpus)))
+        # Both stages run at the same time, each needs at least one thread
+        self.ocr = max(1, self.total // 2)
+        self.inpaint = max(1, self.total - self.ocr)
+        self.rebalances = 0
+        self.pending = False
+        self.latency = {'ocr': [], 'inpaint': []}
+        self.lock = threading.Lock()
+
+    def describe(self):
+        return (f"{self.total} cores (CPUs {format_cpu_set(self.cpus)}): OCR {self.ocr} threads, "
+                f"inpainting {self.inpaint} threads")
+
+    def snapshot(self):
+        return {'cores': self.total, 'cpu_set': format_cpu_set(self.cpus), 'ocr_threads': self.ocr,
+                'inpaint_threads': self.inpaint, 'rebalances': self.rebalances}
+
+    def observe(self, stage, seconds):
+        """Record one page's latency in `stage`. Returns True when the split changed"""
+        if stage not in self.latency:
+            return False
+        with self.lock:
+            self.latency[stage].append(seconds)
+            if min(len(v) for v in self.latency.values()) < REBALANCE_PAGES:
+                return False
+            ocr = sum(self.latency['ocr']) / len(self.latency['ocr'])
+            inpaint = sum(self.latency['inpaint']) / len(self.latency['inpaint'])
+            self.latency = {'ocr': [], 'inpaint': []}
+            if inpaint > ocr * REBALANCE_RATIO and self.ocr > 1:
+                self.ocr, self.inpaint = self.ocr - 1, self.inpaint + 1
+            elif ocr > inpaint * REBALANCE_RATIO and self.inpaint > 1:
+                self.ocr, self.inpaint = self.ocr + 1, self.inpaint - 1
+            else:
+                return False
+            self.rebalances += 1
+            self.pending = True
+            return True
+
+    def take_pending(self):
+        """True once after each change of the split, for the caller to apply it"""
+        with self.lock:
+            pending, self.pending = self.pending, False
+            return pending
+
+
+def parity_sample(size=(512, 384), seed=0):
+    """Synthetic slide crop with text strokes to erase. Returns (image, mask) as PIL images"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    # Gradient background with a few shapes and text strokes to erase
+    base = np.linspace(40, 220, width, dtype=np.float32)[None, :, None]
+    img = np.repeat(np.repeat(base, height, axis=0), 3, axis=2)
+    img += rng.normal(0, 4, img.shape).astype(np.float32)
+    img = np.clip(img, 0, 255).astype(np.uint8)
+    cv2.rectangle(img, (width // 8, height // 6), (width // 3, height // 2), (200, 60, 60), -1)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    for n in range(4):
+        org = (20 + n * width // 5, height // 3 + (n % 2) * height // 4)
+        cv2.putText(img, "Text", org, cv2.FONT_HERSHEY_SIMPLEX, 1.2, (20, 20, 20), 3)
+        cv2.putText(mask, "Text", org, cv2.FONT_HERSHEY_SIMPLEX, 1.2, 255, 3)
+    mask = cv2.dilate(mask, np.ones((7, 7), np.uint8))
+    return Image.fromarray(img), Image.fromarray(mask)
+
+
+def masked_ssim(a, b, mask):
+    """Mean SSIM of two RGB arrays over the masked pixels (luma, 7x7 Gaussian window)"""
+    a = cv2.cvtColor(np.asarray(a, dtype=np.uint8), cv2.COLOR_RGB2GRAY).astype(np.float64)
+    b = cv2.cvtColor(np.asarray(b, dtype=np.uint8), cv2.COLOR_RGB2GRAY).astype(np.float64)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def blur(x):
+        return cv2.GaussianBlur(x, (7, 7), 1.5)
+    mu_a, mu_b = blur(a), blur(b)
+    var_a, var_b = blur(a * a) - mu_a ** 2, blur(b * b) - mu_b ** 2
+    cov = blur(a * b) - mu_a * mu_b
+    ssim = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim[mask > 0].mean())
+
+
+def inpainter_parity(reference, candidate, size=(512, 384), seed=0, samples=None):
+    """Run two inpainters on the same slide crops and compare the masked pixels.
+
+    `samples` is a list of (image, mask) pairs, one synthetic crop by default.
+    Returns a dict with the mean/max absolute difference and the PSNR (dB) over
+    all masked pixels, the mean masked SSIM, and the seconds each inpainter
+    took (after one warm-up call) of the candidate against the reference.
+    """
+    samples = samples or [parity_sample(size, seed)]
+    timings = {}
+    outputs = {}
+    for role, inpainter in (('reference', reference), ('candidate', candidate)):
+        inpainter(*samples[0])
+        start = time.perf_counter()
+        outputs[role] = [np.asarray(inpainter(image, mask), dtype=np.float32) for image, mask in samples]
+        timings[inpainter.label if inpainter.label not in timings else role] = round(time.perf_counter() - start, 3)
+    diffs, ssims = [], []
+    for (image, mask), ref, out in zip(samples, outputs['reference'], outputs['candidate']):
+        inside = np.asarray(mask) > 0
+        diffs.append(np.abs(ref - out)[inside])
+        ssims.append(masked_ssim(ref, out, inside))
+    diff = np.concatenate(diffs)
+    mse = float((diff ** 2).mean())
+    return {
+        'mean_abs_diff': round(float(diff.mean()), 3),
+        'max_abs_diff': float(diff.max()),
+        'psnr_db': round(10 * np.log10(255 ** 2 / mse), 2) if mse > 0 else 100.0,
+        'ssim': round(float(np.mean(ssims)), 4),
+        'seconds': timings,
+    }
+
+
+def precision_report(backend='auto', onnx_model=None, intra_op_threads=0, inter_op_threads=0, log=print):
+    """Check every precision mode of an inpainting backend against its fp32 output.
+
+    Runs PRECISION_REFERENCE_SET through each mode. Returns one dict per mode
+    with its masked PSNR/SSIM against fp32, its time and speedup, and 'ok' when
+    it meets PARITY_MIN_PSNR and PARITY_MIN_SSIM. Only the modes the backend
+    implements are tried; those the CPU cannot run are reported with
+    'available': False.
+    """
+    samples = [parity_sample(size, seed) for size, seed in PRECISION_REFERENCE_SET]
+    quiet = lambda msg: None
+    reference = create_inpainter(backend, onnx_model, intra_op_threads, inter_op_threads, log=quiet)
+    reports = []
+    for precision in reference.precisions:
+        if precision == 'fp32':
+            continue
+        notes = []
+        candidate = create_inpainter(backend, onnx_model, intra_op_threads, inter_op_threads,
+                                     log=notes.append, precision=precision)
+        report = {'backend': reference.name, 'precision': precision}
+        if candidate.precision != precision:
+            report.update(available=False, ok=False, note=notes[-1] if notes else "")
+            reports.append(report)
+            continue
+        report.update(inpainter_parity(reference, candidate, samples=samples), available=True)
+        fp32_s, mode_s = report['seconds'][reference.label], report['seconds'][candidate.label]
+        report['speedup'] = round(fp32_s / mode_s, 2) if mode_s > 0 else None
+        report['ok'] = report['psnr_db'] >= PARITY_MIN_PSNR and report['ssim'] >= PARITY_MIN_SSIM
+        reports.append(report)
+        log(f"{reference.name} {precision}: PSNR {report['psnr_db']} dB, SSIM {report['ssim']}, "
+            f"x{report['speedup']} vs fp32 -> {'OK' if report['ok'] else 'FAIL'}")
+    return reports
+
+
+class PageJob:
+    """State of one page while it travels through the conversion pipeline"""
+    def __init__(self, index, width_pt, height_pt):
+        self.index = index
+        self.width_pt = width_pt
+        self.height_pt = height_pt
+        self.image = None
+        self.mask = None
+        self.text_blocks = []
+        self.background = None
+        self.encoded = None
+        self.encoded_ext = None
+        self.ocr_result = None
+        self.native = None
+        self.stripped = None
+        self.cache_key = None
+        self.from_cache = False
+        # Template reuse: reference page borrowed from, its reusable tile grid,
+        # and the reference this page registered for later pages
+        self.template_ref = None
+        self.template_zone = None
+        self.template_out = None
+        # Pool arrays holding this page's rasters, handed back once the background is encoded
+        self.buffers = []
+        # LaMa crops of this page still queued for a batch (PendingInpaint), awaited by the encode stage
+        self.pending = None
+        # Tiled pages arrive at the encode stage already cleaned, possibly at the output DPI
+        self.background_dpi = None
+        # Finished in an earlier, interrupted run: carries its encoded slide and skips all stages
+        self.restored = False
+        self.error = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be read"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class ConversionMetrics:
+    """Per-stage, per-page instrumentation of one convert() call.
+
+    Stage times are wall clock plus CPU time of the stage's own thread
+    (work done on library thread pools, e.g. ONNX Runtime or torch, shows up
+    in the file-level process CPU time only). Only created when metrics are
+    enabled, so the disabled hot path is a single `is None` check per stage.
+    """
+    CSV_FIELDS = ['page', 'stage', 'wall_s', 'cpu_s']
+
+    def __init__(self, pdf_path, dpi, use_gpu=False):
+        self.pdf_path = pdf_path
+        self.dpi = dpi
+        self.use_gpu = use_gpu
+        self.stage_rows = []
+        self.pages = {}
+        self._lock = threading.Lock()
+        self.extra = {}
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        if use_gpu:
+            torch.cuda.reset_peak_memory_stats()
+
+    def stage(self, page, stage, wall, cpu):
+        with self._lock:
+            self.stage_rows.append({'page': page, 'stage': stage, 'wall_s': round(wall, 5), 'cpu_s': round(cpu, 5)})
+
+    def page(self, page, **fields):
+        with self._lock:
+            self.pages.setdefault(page, {'page': page}).update(fields)
+
+    def merge(self, stage_rows, pages, **fields):
+        """Add the stage rows and per-page fields measured by a page worker (`fields` tag its pages)"""
+        with self._lock:
+            self.stage_rows.extend(stage_rows)
+            for page in pages:
+                self.pages.setdefault(page['page'], {'page': page['page']}).update(page, **fields)
+
+    def summary(self, ok=True):
+        wall = time.perf_counter() - self._wall_start
+        stages = {}
+        for row in self.stage_rows:
+            stages.setdefault(row['stage'], []).append(row)
+        pages = [self.pages[n] for n in sorted(self.pages)]
+        coverage = [p['mask_coverage_pct'] for p in pages if p.get('mask_coverage_pct') is not None]
+        summary = {
+            'file': self.pdf_path,
+            'ok': ok,
+            'dpi': self.dpi,
+            'pages': len(pages),
+            'wall_s': round(wall, 3),
+            'cpu_s': round(time.process_time() - self._cpu_start, 3),
+            'pages_per_s': round(len(pages) / wall, 3) if wall > 0 else None,
+            'peak_rss_mb': peak_rss_mb(),
+            'peak_gpu_mb': round(torch.cuda.max_memory_allocated() / (1024 * 1024), 1) if self.use_gpu else None,
+            'ocr_boxes': sum(p.get('ocr_boxes', 0) for p in pages),
+            'native_lines': sum(p.get('native_lines', 0) for p in pages),
+            'mask_coverage_pct': round(sum(coverage) / len(coverage), 3) if coverage else None,
+            'stages': {},
+            'page_details': pages,
+        }
+        summary.update(self.extra)
+        for name, rows in stages.items():
+            walls = [r['wall_s'] for r in rows]
+            summary['stages'][name] = {
+                'count': len(rows),
+                'wall_s': round(sum(walls), 4),
+                'cpu_s': round(sum(r['cpu_s'] for r in rows), 4),
+                'p50_s': percentile(walls, 50),
+                'p95_s': percentile(walls, 95),
+                'max_s': max(walls),
+            }
+        return summary
+
+    def write(self, base_path, summary):
+        """Write <base>_metrics.json (summary) and <base>_metrics.csv (one row per page and stage)"""
+        with open(base_path + "_metrics.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        with open(base_path + "_metrics.csv", "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(sorted(self.stage_rows, key=lambda r: (r['page'], r['stage'])))
+
+
+class PageCache:
+    """On-disk, content-addressed cache of per-page OCR boxes and cleaned backgrounds.
+
+    Entries are keyed by a hash of the rendered page pixels together with every
+    setting that changes the result (DPI, dilation, model identity, ...). Each entry
+    is a `<key>.json` holding the OCR boxes and a `<key>.png` holding the cleaned
+    background. File mtimes double as LRU timestamps: hits touch the entry and the
+    least recently used entries are evicted once the directory exceeds max_bytes.
+    Writes go through a temp file + os.replace so several processes can share one
+    cache directory.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.size = sum(size for _, size, _ in self._entries())
+
+    def make_key(self, image, *settings, stripped=None):
+        """Hash a page raster (PIL image or RGB array, same key for the same pixels) and its settings.
+
+        `stripped` is the text-stripped render the background is cleaned from: two pages that
+        look the same but carry different text objects must not share a background.
+        """
+        h = hashlib.blake2b(digest_size=20)
+        for n, raster in enumerate((image, stripped)):
+            if raster is None:
+                continue
+            prefix = "" if n == 0 else "stripped|"
+            if isinstance(raster, np.ndarray):
+                h.update(f"{prefix}RGB|{(raster.shape[1], raster.shape[0])}|{settings!r}".encode("utf-8"))
+                h.update(np.ascontiguousarray(raster).data)
+            else:
+                h.update(f"{prefix}{raster.mode}|{raster.size}|{settings!r}".encode("utf-8"))
+                h.update(raster.tobytes())
+        return h.hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".json", base + ".png"
+
+    def get(self, key):
+        """Return (ocr_result, background_image) for a cached page, or None"""
+        json_path, png_path = self._paths(key)
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                ocr_result = json.load(f)
+            with Image.open(png_path) as img:
+                img.load()
+                background = img.copy() if img.mode in ("RGB", "RGBA") else img.convert("RGB")
+        except (OSError, ValueError):
+            return None
+        # Refresh recency for LRU eviction
+        for path in (json_path, png_path):
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+        return ocr_result, background
+
+    def put(self, key, ocr_result, background, png_bytes=None):
+        """Store a page. `png_bytes` is an already encoded PNG of `background`, written as is"""
+        json_path, png_path = self._paths(key)
+        boxes = [[[[float(x), float(y)] for x, y in box], text, float(score)]
+                 for box, text, score in (ocr_result or [])]
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if png_bytes:
+                with open(png_path + tmp_suffix, "wb") as f:
+                    f.write(png_bytes)
+            else:
+                background.save(png_path + tmp_suffix, format="PNG")
+            os.replace(png_path + tmp_suffix, png_path)
+            # The JSON goes last: its presence marks a complete entry
+            with open(json_path + tmp_suffix, "w", encoding="utf-8") as f:
+                json.dump(boxes, f, ensure_ascii=False)
+            os.replace(json_path + tmp_suffix, json_path)
+            added = os.path.getsize(png_path) + os.path.getsize(json_path)
+        except OSError:
+            return
+
+        with self.lock:
+            self.size += added
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """(key, total_bytes, last_used) for every complete entry in the cache directory"""
+        entries = {}
+        for name in os.listdir(self.cache_dir):
+            key, ext = os.path.splitext(name)
+            if ext not in (".json", ".png"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            size, last_used = entries.get(key, (0, 0))
+            entries[key] = (size + st.st_size, max(last_used, st.st_mtime))
+        return [(key, size, last_used) for key, (size, last_used) in entries.items()]
+
+    def _evict(self):
+        # Rescan: other processes may have added or evicted entries meanwhile
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        self.size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for key, size, _ in entries:
+            if self.size <= target:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.size -= size
+
+
+class JobCheckpoint:
+    """Persistent job directory that lets an interrupted conversion resume.
+
+    Each finished page is stored as its encoded background (`page_00001.jpg`) and
+    a `page_00001.json` with the slide size and text blocks. The JSON is written
+    last, so its presence marks a complete page. `manifest.json` records the
+    source PDF and the settings. The directory name hashes the PDF contents
+    together with the settings: a restart with the same input and options picks
+    up the finished pages, any change starts from scratch.
+    """
+    def __init__(self, root, pdf_path, settings):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        stem = os.path.splitext(os.path.basename(pdf_path))[0]
+        self.path = os.path.join(root, f"{stem}-{digest.hexdigest()}")
+        os.makedirs(self.path, exist_ok=True)
+        manifest = os.path.join(self.path, "manifest.json")
+        if not os.path.exists(manifest):
+            self._write(manifest, json.dumps({'pdf': os.path.abspath(pdf_path), 'settings': settings},
+                                             ensure_ascii=False, indent=1).encode("utf-8"))
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _base(self, index):
+        return os.path.join(self.path, f"page_{index + 1:05d}")
+
+    def finished(self):
+        """Indices of the pages completed by earlier runs"""
+        done = set()
+        for name in os.listdir(self.path):
+            if name.startswith("page_") and name.endswith(".json") and name[5:-5].isdigit():
+                done.add(int(name[5:-5]) - 1)
+        return done
+
+    def save(self, job):
+        """Record a page whose background has been encoded"""
+        base = self._base(job.index)
+        self._write(f"{base}.{job.encoded_ext}", job.encoded)
+        record = {'width_pt': float(job.width_pt), 'height_pt': float(job.height_pt),
+                  'ext': job.encoded_ext, 'text_blocks': job.text_blocks}
+        self._write(base + ".json", json.dumps(record, ensure_ascii=False).encode("utf-8"))
+
+    def load(self, index):
+        """Rebuild a finished page as a restored PageJob, or None if its files are unreadable"""
+        base = self._base(index)
+        try:
+            with open(base + ".json", "r", encoding="utf-8") as f:
+                record = json.load(f)
+            with open(f"{base}.{record['ext']}", "rb") as f:
+                encoded = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        job = PageJob(index, record['width_pt'], record['height_pt'])
+        job.encoded, job.encoded_ext = encoded, record['ext']
+        job.text_blocks = record['text_blocks']
+        job.restored = True
+        return job
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class TemplateReference:
+    """A processed page other pages of the same document can borrow results from"""
+    def __init__(self, index, hashes, ocr_result):
+        self.index = index
+        self.hashes = hashes
+        self.ocr_result = ocr_result
+        # Cleaned background, set once the page has been inpainted
+        self.background = None
+
+
+class TemplateStore:
+    """Detects regions repeated across the pages of one document (headers, footers, logos,
+    master backgrounds) so they are OCR'd and inpainted only once.
+
+    Every page raster is cut into TEMPLATE_TILE_PX tiles and each tile is hashed
+    exactly (blake2b of the pixels). A page is matched against the reference pages
+    seen so far at the same tile positions. Only tiles whose whole 3x3 neighbourhood
+    matches are reused, so text lines, mask dilation and inpainting context that
+    cross into a differing tile never leak stale results. Pages that do not
+    mostly match an existing reference become references themselves.
+    """
+    def __init__(self, tile=None, max_refs=None):
+        self.tile = tile or TEMPLATE_TILE_PX
+        self.max_refs = max_refs or TEMPLATE_MAX_REFERENCES
+        self.refs = []
+        self._lock = threading.Lock()
+
+    def tile_hashes(self, *rasters):
+        """(rows, cols) uint64 grid of per-tile hashes over one or more same-sized rasters"""
+        height, width = rasters[0].shape[:2]
+        t = self.tile
+        rows, cols = -(-height // t), -(-width // t)
+        hashes = np.zeros((rows, cols), dtype=np.uint64)
+        for r in range(rows):
+            for c in range(cols):
+                h = hashlib.blake2b(digest_size=8)
+                for raster in rasters:
+                    h.update(np.ascontiguousarray(raster[r * t:(r + 1) * t, c * t:(c + 1) * t]).data)
+                hashes[r, c] = int.from_bytes(h.digest(), 'little')
+        return hashes
+
+    def match(self, hashes):
+        """Best reference for a page and its reusable tile grid (bool), or (None, None)"""
+        with self._lock:
+            refs = list(self.refs)
+        best, best_count, best_same = None, 0, None
+        for ref in refs:
+            if ref.hashes.shape != hashes.shape:
+                continue
+            same = ref.hashes == hashes
+            count = int(same.sum())
+            if count > best_count:
+                best, best_count, best_same = ref, count, same
+        if best is None or best_count < TEMPLATE_MIN_SHARED * hashes.size:
+            return None, None
+        # Keep only tiles whose neighbours match too (page edges count as matching)
+        zone = cv2.erode(best_same.astype(np.uint8), np.ones((3, 3), np.uint8),
+                         borderType=cv2.BORDER_CONSTANT, borderValue=1).astype(bool)
+        if not zone.any():
+            return None, None
+        with self._lock:
+            # Most recently used references are checked last-evicted
+            if best in self.refs:
+                self.refs.remove(best)
+                self.refs.append(best)
+        return best, zone
+
+    def add(self, index, hashes, ocr_result):
+        ref = TemplateReference(index, hashes, ocr_result)
+        with self._lock:
+            self.refs.append(ref)
+            if len(self.refs) > self.max_refs:
+                self.refs.pop(0)
+        return ref
+
+    def zone_slices(self, zone):
+        """Pixel (row slice, col slice) rects covering the zone, one per horizontal run of tiles"""
+        t = self.tile
+        for r, row in enumerate(zone):
+            c = 0
+            while c < len(row):
+                if row[c]:
+                    start = c
+                    while c < len(row) and row[c]:
+                        c += 1
+                    yield slice(r * t, (r + 1) * t), slice(start * t, c * t)
+                else:
+                    c += 1
+
+    def rect_inside(self, rect, zone):
+        x0, y0, x1, y1 = rect
+        t = self.tile
+        return bool(zone[y0 // t:(max(y1, y0 + 1) - 1) // t + 1, x0 // t:(max(x1, x0 + 1) - 1) // t + 1].all())
+
+    def inside_mask(self, polys, zone):
+        """Bool array: which (N, 4, 2) pixel polygons lie entirely inside the zone tiles"""
+        t = self.tile
+        rows, cols = zone.shape
+        c0 = np.clip((polys[:, :, 0].min(axis=1) // t).astype(int), 0, cols - 1)
+        c1 = np.clip((polys[:, :, 0].max(axis=1) // t).astype(int), 0, cols - 1)
+        r0 = np.clip((polys[:, :, 1].min(axis=1) // t).astype(int), 0, rows - 1)
+        r1 = np.clip((polys[:, :, 1].max(axis=1) // t).astype(int), 0, rows - 1)
+        return np.array([zone[a:b + 1, c:d + 1].all() for a, b, c, d in zip(r0, r1, c0, c1)], dtype=bool)
+
+    def boxes_inside(self, ocr_result, zone):
+        """Split OCR-style items into (inside the zone, not inside)"""
+        if not ocr_result:
+            return [], []
+        inside = self.inside_mask(polygon_array(ocr_result), zone)
+        return ([item for item, flag in zip(ocr_result, inside) if flag],
+                [item for item, flag in zip(ocr_result, inside) if not flag])
+
+
+class StreamingPptxWriter:
+    """Write a .pptx incrementally instead of holding a whole Presentation in memory.
+
+    python-pptx keeps every part, picture blobs included, in memory until save().
+    This writer takes the package skeleton (masters, layouts, theme) from
+    python-pptx's default template and streams each slide and its background image
+    into the zip as soon as it is added. The parts that list the slides
+    (presentation.xml, its relationships and [Content_Types].xml) are written on
+    close(), so memory stays flat regardless of page count. The file is written
+    under a temporary name and moved into place on close().
+    """
+    NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+    NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+    NS_CT = "http://schemas.openxmlformats.org/package/2006/content-types"
+    RT_SLIDE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+    RT_LAYOUT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout"
+    RT_IMAGE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+    CT_SLIDE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+    IMAGE_TYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+    # Parts rewritten on close(); everything else is copied from the template as is
+    DEFERRED_PARTS = ("ppt/presentation.xml", "ppt/_rels/presentation.xml.rels", "[Content_Types].xml")
+
+    def __init__(self, path, width_pt, height_pt):
+        self.path = path
+        self.tmp_path = path + ".part"
+        self.slide_count = 0
+        self.image_exts = set()
+
+        from pptx import Presentation
+        prs = Presentation()
+        prs.slide_width = emu(width_pt)
+        prs.slide_height = emu(height_pt)
+        template_buf = io.BytesIO()
+        prs.save(template_buf)
+        del prs
+        self.template = zipfile.ZipFile(template_buf)
+        self.layout_target = self._blank_layout()
+
+        self.zip = zipfile.ZipFile(self.tmp_path, "w", zipfile.ZIP_DEFLATED)
+        for name in self.template.namelist():
+            if name not in self.DEFERRED_PARTS:
+                self.zip.writestr(name, self.template.read(name))
+
+    def _blank_layout(self):
+        # Same layout as prs.slide_layouts[6] in the default template
+        for name in sorted(self.template.namelist()):
+            if name.startswith("ppt/slideLayouts/") and name.endswith(".xml"):
+                if b'name="Blank"' in self.template.read(name):
+                    return "../slideLayouts/" + name.rsplit("/", 1)[1]
+        return "../slideLayouts/slideLayout7.xml"
+
+    def add_slide(self, image_bytes=None, image_ext=None, width_pt=0, height_pt=0, text_blocks=()):
+        """Append a slide with a full-slide background picture and editable text boxes.
+
+        Without image_bytes an empty slide is added (keeps page numbering on errors).
+        The slide only counts once its parts are written, so after a failed call
+        the same slide number can still be filled, e.g. with an empty slide.
+        """
+        n = self.slide_count + 1
+        rels = [f'<Relationship Id="rId1" Type="{self.RT_LAYOUT}" Target="{self.layout_target}"/>']
+        shapes = []
+        shape_id = 2
+
+        if image_bytes:
+            media_name = f"image{n}.{image_ext}"
+            rels.append(f'<Relationship Id="rId2" Type="{self.RT_IMAGE}" Target="../media/{media_name}"/>')
+            shapes.append(
+                f'<p:pic><p:nvPicPr><p:cNvPr id="{shape_id}" name="Picture {shape_id - 1}"/>'
+                '<p:cNvPicPr><a:picLocks noChangeAspect="1"/></p:cNvPicPr><p:nvPr/></p:nvPicPr>'
+                '<p:blipFill><a:blip r:embed="rId2"/><a:stretch><a:fillRect/></a:stretch></p:blipFill>'
+                f'<p:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{emu(width_pt)}" cy="{emu(height_pt)}"/></a:xfrm>'
+                '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom></p:spPr></p:pic>')
+            shape_id += 1
+
+        for block in text_blocks:
+            if block.get('font_size'):
+                size = block['font_size']
+            elif block['h'] > 0:
+                size = block['h'] * 0.8
+            else:
+                size = None
+            size_attr = f' sz="{min(max(int(size * 100), 100), 400000)}"' if size else ''
+            # Drop characters that are not allowed in XML 1.0
+            text = ''.join(ch for ch in block['text'] if ch >= ' ' or ch == '\t')
+            shapes.append(
+                f'<p:sp><p:nvSpPr><p:cNvPr id="{shape_id}" name="TextBox {shape_id - 1}"/>'
+                '<p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+                f'<p:spPr><a:xfrm><a:off x="{emu(block["x"])}" y="{emu(block["y"])}"/>'
+                f'<a:ext cx="{emu(max(block["w"], 0))}" cy="{emu(max(block["h"], 0))}"/></a:xfrm>'
+                '<a:prstGeom prst="rect"><a:avLst/></a:prstGeom><a:noFill/></p:spPr>'
+                '<p:txBody><a:bodyPr wrap="square" rtlCol="0"><a:spAutoFit/></a:bodyPr><a:lstStyle/>'
+                f'<a:p><a:r><a:rPr lang="en-US"{size_attr} dirty="0"/><a:t>{xml_escape(text)}</a:t></a:r></a:p>'
+                '</p:txBody></p:sp>')
+            shape_id += 1
+
+        slide_xml = (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<p:sld xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+            f'xmlns:r="{self.NS_R}" xmlns:p="{self.NS_P}"><p:cSld><p:spTree>'
+            '<p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr>'
+            '<p:grpSpPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/>'
+            '<a:chOff x="0" y="0"/><a:chExt cx="0" cy="0"/></a:xfrm></p:grpSpPr>'
+            + ''.join(shapes) +
+            '</p:spTree></p:cSld><p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>')
+        rels_xml = (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{self.NS_PKG_REL}">' + ''.join(rels) + '</Relationships>')
+        if image_bytes:
+            self.image_exts.add(image_ext)
+            # Already compressed, deflating again only costs time
+            self.zip.writestr(f"ppt/media/{media_name}", image_bytes, compress_type=zipfile.ZIP_STORED)
+        self.zip.writestr(f"ppt/slides/slide{n}.xml", slide_xml)
+        self.zip.writestr(f"ppt/slides/_rels/slide{n}.xml.rels", rels_xml)
+        self.slide_count = n
+
+    def close(self):
+        """Write the slide list parts and move the finished file into place"""
+        from lxml import etree
+
+        # Relationships: presentation -> slides
+        rels = etree.fromstring(self.template.read("ppt/_rels/presentation.xml.rels"))
+        used = {int(r.get("Id")[3:]) for r in rels if r.get("Id", "").startswith("rId") and r.get("Id")[3:].isdigit()}
+        next_rid = max(used, default=0) + 1
+        slide_rids = []
+        for n in range(1, self.slide_count + 1):
+            rid = f"rId{next_rid}"
+            next_rid += 1
+            etree.SubElement(rels, f"{{{self.NS_PKG_REL}}}Relationship",
+                             Id=rid, Type=self.RT_SLIDE, Target=f"slides/slide{n}.xml")
+            slide_rids.append(rid)
+
+        # presentation.xml: <p:sldIdLst> goes right after the master id lists
+        pres = etree.fromstring(self.template.read("ppt/presentation.xml"))
+        sld_id_lst = pres.find(f"{{{self.NS_P}}}sldIdLst")
+        if sld_id_lst is None:
+            sld_id_lst = etree.Element(f"{{{self.NS_P}}}sldIdLst")
+            anchor = None
+            for tag in ("sldMasterIdLst", "notesMasterIdLst", "handoutMasterIdLst"):
+                el = pres.find(f"{{{self.NS_P}}}{tag}")
+                if el is not None:
+                    anchor = el
+            if anchor is not None:
+                anchor.addnext(sld_id_lst)
+            else:
+                pres.insert(0, sld_id_lst)
+        for k, rid in enumerate(slide_rids):
+            etree.SubElement(sld_id_lst, f"{{{self.NS_P}}}sldId", id=str(256 + k),
+                             attrib={f"{{{self.NS_R}}}id": rid})
+
+        # Content types: image defaults + one override per slide
+        types = etree.fromstring(self.template.read("[Content_Types].xml"))
+        defaults = {d.get("Extension", "").lower() for d in types.findall(f"{{{self.NS_CT}}}Default")}
+        for ext in sorted(self.image_exts - defaults):
+            default = etree.Element(f"{{{self.NS_CT}}}Default", Extension=ext, ContentType=self.IMAGE_TYPES[ext])
+            types.insert(0, default)
+        for n in range(1, self.slide_count + 1):
+            etree.SubElement(types, f"{{{self.NS_CT}}}Override",
+                             PartName=f"/ppt/slides/slide{n}.xml", ContentType=self.CT_SLIDE)
+
+        for name, root in (("ppt/_rels/presentation.xml.rels", rels),
+                           ("ppt/presentation.xml", pres),
+                           ("[Content_Types].xml", types)):
+            self.zip.writestr(name, etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True))
+        self.zip.close()
+        self.template.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Discard a partially written file"""
+        try:
+            self.zip.close()
+            self.template.close()
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+# --- Conversion Logic (Refactored for GUI) ---
+class ConverterLogic:
+    def __init__(self, log_callback=print, roi_padding=DEFAULT_ROI_PADDING,
+                 roi_full_page_ratio=DEFAULT_ROI_FULL_PAGE_RATIO, progress_callback=None,
+                 cache_dir=None, cache_size_mb=DEFAULT_CACHE_SIZE_MB, native_text=True,
+                 background_mode='auto', image_format=DEFAULT_IMAGE_FORMAT, image_quality=DEFAULT_IMAGE_QUALITY,
+                 png_compress_level=DEFAULT_PNG_COMPRESS_LEVEL, output_dpi=None, inpaint_backend='auto',
+                 onnx_model=None, ort_intra_threads=0, ort_inter_threads=0, region_solver='auto',
+                 metrics=False, metrics_hook=None, ocr_dpi=DEFAULT_OCR_DPI, ocr_small_text_px=OCR_SMALL_TEXT_PX,
+                 ocr_use_det=True, ocr_use_cls=True, ocr_use_rec=True, template_reuse=True,
+                 max_megapixels=DEFAULT_MAX_MEGAPIXELS, job_dir=None, page_workers=1, inpaint_precision='fp32',
+                 lama_batch_size=1, lama_batch_wait_ms=LAMA_BATCH_WAIT_MS, cores=None, cpu_set=None):
+        self.log = log_callback
+        # Core budget split between OCR and inpainting threads (see ResourceManager): cores=0
+        # uses every CPU of the process, cpu_set pins it first (one of several workers),
+        # cores=None leaves every library to size its own thread pool
+        self.cores = cores
+        self.resources = ResourceManager(cores, cpu_set, self.log) if cores is not None else None
+        self.ocr_threads = None
+        # Batched LaMa: crops of consecutive pages with the same padded size share one forward
+        # pass of up to lama_batch_size crops (1 = one call per crop, no scheduler thread)
+        self.lama_batch_size = lama_batch_size
+        self.lama_batch_wait_ms = lama_batch_wait_ms
+        self.batcher = None
+        # LaMa numeric mode: 'fp32', 'frozen' / 'bf16' (torch) or 'int8' (ONNX), see INPAINT_PRECISIONS
+        self.inpaint_precision = inpaint_precision
+        # Split the pages of each PDF across this many worker processes (their own models),
+        # which write into a job directory the slides are then assembled from. The worker
+        # processes are started with the first split file and kept warm for the next ones
+        self.page_workers = page_workers
+        self.page_pool = None
+        # Checkpointing: finished pages are kept under job_dir so that a crashed or stopped
+        # conversion resumes where it left off. None = no checkpoints
+        self.job_dir = job_dir
+        # Pages rendering larger than this (megapixels) are processed in overlapping tiles
+        # so memory stays bounded by the tile size. 0/None = always render the whole page
+        self.max_megapixels = max_megapixels
+        # Reuse OCR boxes and cleaned pixels of regions repeated across pages (headers, logos...)
+        self.template_reuse = template_reuse
+        # Two-resolution OCR: detect (and read) text at ocr_dpi, map boxes back to the render
+        # resolution and re-read small lines from full-resolution crops. None = OCR at render DPI
+        self.ocr_dpi = ocr_dpi
+        self.ocr_small_text_px = ocr_small_text_px
+        # RapidOCR stage toggles (detection, angle classification, recognition)
+        self.ocr_use_det = ocr_use_det
+        self.ocr_use_cls = ocr_use_cls
+        self.ocr_use_rec = ocr_use_rec
+        # Instrumentation: metrics=True writes <output>_metrics.json/.csv, metrics_hook(summary)
+        # receives the per-file summary dict. With neither, no timing data is collected.
+        self.metrics_enabled = metrics
+        self.metrics_hook = metrics_hook
+        self.metrics = None
+        self.last_metrics = None
+        # 'auto': fill flat / low-texture regions without LaMa, 'lama': LaMa for every region
+        self.region_solver = region_solver
+        # Inpainting backend: 'torch' (SimpleLama), 'onnx' (ONNX Runtime) or 'auto'
+        self.inpaint_backend = inpaint_backend
+        self.onnx_model = onnx_model
+        self.ort_intra_threads = ort_intra_threads
+        self.ort_inter_threads = ort_inter_threads
+        # Slide background encoding: codec, JPEG/WebP quality, PNG zlib level and an
+        # optional output DPI below the render DPI to downsample the backgrounds
+        self.image_format = image_format
+        self.image_quality = image_quality
+        self.png_compress_level = png_compress_level
+        self.output_dpi = output_dpi
+        # Use the PDF's embedded text layer instead of OCR when it is usable
+        self.native_text = native_text
+        # 'auto': render born-digital pages without their text objects and inpaint only what is
+        # left (raster text); 'inpaint': always erase text with LaMa
+        self.background_mode = background_mode
+        # Page result cache, disabled unless a cache directory is given
+        self.cache = PageCache(cache_dir, cache_size_mb * 1024 * 1024) if cache_dir else None
+        self.model_id = None
+        self.progress_callback = progress_callback
+        self.roi_padding = roi_padding
+        self.roi_full_page_ratio = roi_full_page_ratio
+        self.stop_flag = False
+        self.current_file = None
+        self.ocr_engine = None
+        self.inpainter = None
+        self.is_gpu = False
+        # Page rasters are rendered into and cleaned in reused arrays
+        self.buffers = BufferPool()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        # Startup / warm-up timings in seconds, reported in the log
+        self.timings = {}
+    
+    def initialize_models(self):
+        """Initialize OCR and LaMa models once for the entire batch.
+
+        Safe to call from several threads: a conversion that starts while the
+        background warm-up is still loading simply waits for it.
+        """
+        with self._init_lock:
+            if self._initialized:
+                return True
+            start = time.perf_counter()
+
+            # Initialize OCR
+            try:
+                self.log("Initializing OCR engine...")
+                if self.resources is not None:
+                    self.log(f"Core budget: {self.resources.describe()}")
+                self.ocr_engine = self.create_ocr_engine()
+                self.timings['ocr_init'] = time.perf_counter() - start
+            except Exception as e:
+                self.log(f"Error initializing OCR: {e}")
+                return False
+
+            # Initialize LaMa
+            try:
+                self.log("Initializing LaMa AI model...")
+                lama_start = time.perf_counter()
+                if HAS_TORCH and torch.cuda.is_available():
+                    self.log(f"✅ GPU Detected: {torch.cuda.get_device_name(0)}")
+                else:
+                    self.log("⚠️ GPU NOT Detected. Running on CPU (Slow Mode)")
+
+                # Bundle logic: load the TorchScript archive in place from the bundle
+                # (SimpleLama honours LAMA_MODEL), no copy into a fake TORCH_HOME
+                if getattr(sys, 'frozen', False) and not os.environ.get('LAMA_MODEL'):
+                    self.log(f"Loading bundled model...")
+                    os.environ['LAMA_MODEL'] = os.path.join(sys._MEIPASS, 'big-lama.pt')
+
+                intra_threads = self.ort_intra_threads
+                if not intra_threads and self.resources is not None:
+                    intra_threads = self.resources.inpaint
+                self.inpainter = create_inpainter(self.inpaint_backend, self.onnx_model,
+                                                  intra_threads, self.ort_inter_threads, log=self.log,
+                                                  precision=self.inpaint_precision)
+                self.is_gpu = self.inpainter.is_gpu
+                if self.resources is not None:
+                    self.apply_threads()
+
+                self.timings['lama_init'] = time.perf_counter() - lama_start
+                self.timings['models_total'] = time.perf_counter() - start
+                self.log(f"LaMa model loaded. (OCR {self.timings['ocr_init']:.1f}s, "
+                         f"LaMa {self.timings['lama_init']:.1f}s)")
+                self.model_id = self.model_identity()
+                self._initialized = True
+                return True
+            except Exception as e:
+                self.log(f"Error initializing LaMa: {e}")
+                # No partial init: callers treat False as fatal (CLI exit 3, service workers marked failed)
+                return False
+
+    def create_ocr_engine(self):
+        """RapidOCR sized to the OCR share of the core budget (its own default without a budget)"""
+        from rapidocr_onnxruntime import RapidOCR
+        if self.resources is None:
+            return RapidOCR()
+        self.ocr_threads = self.resources.ocr
+        return RapidOCR(intra_op_num_threads=self.ocr_threads, inter_op_num_threads=1)
+
+    def apply_threads(self, rebuild=False):
+        """Hand the current OCR/inpainting split to OpenCV, torch and, with `rebuild`, onnxruntime.
+
+        OpenCV and torch follow at once. onnxruntime sessions cannot be resized,
+        so the OCR engine and an ONNX LaMa session are only recreated with
+        `rebuild`, between files.
+        """
+        res = self.resources
+        cv2.setNumThreads(res.ocr)
+        if self.inpainter is not None and not (self.inpainter.name == 'onnx' and self.ort_intra_threads):
+            self.inpainter.set_threads(res.inpaint, rebuild)
+        if rebuild and self.ocr_engine is not None and self.ocr_threads not in (None, res.ocr):
+            self.ocr_engine = self.create_ocr_engine()
+
+    def rebalance_threads(self):
+        """Apply the split the ResourceManager settled on, if it changed since the last page.
+
+        Called by the pipeline source between pages, so the process-wide OpenCV
+        pool is only ever resized from one thread, never from the stage threads.
+        """
+        if self.resources is None or not self.resources.take_pending():
+            return
+        self.apply_threads()
+        self.log(f"  Rebalanced cores: OCR {self.resources.ocr} threads, "
+                 f"inpainting {self.resources.inpaint} threads")
+        self.emit('threads', **self.resources.snapshot())
+
+    def start_warmup(self, on_done=None):
+        """Load the models on a background thread so the first conversion starts warm"""
+        def run():
+            ok = self.initialize_models()
+            if on_done is not None:
+                on_done(ok)
+        t = threading.Thread(target=run, daemon=True)
+        t.start()
+        return t
+
+    def load_models_from(self, other):
+        """Reuse the (possibly still warming up) models of another ConverterLogic"""
+        if not other.initialize_models():
+            return False
+        self.ocr_engine = other.ocr_engine
+        self.ocr_threads = other.ocr_threads
+        self.inpainter = other.inpainter
+        self.is_gpu = other.is_gpu
+        self.model_id = other.model_id
+        self.timings.update(other.timings)
+        self._initialized = True
+        return True
+
+    def model_identity(self, loaded=True):
+        """Identify the loaded OCR/LaMa models so cached pages are invalidated on model upgrades.
+
+        With loaded=False, identify the models the settings select (backend,
+        weights file, requested precision) without loading them.
+        """
+        try:
+            from importlib.metadata import version
+            ocr_version = version("rapidocr_onnxruntime")
+        except Exception:
+            ocr_version = "unknown"
+        if loaded:
+            lama = self.inpainter.identity()
+        else:
+            backend, onnx_model = resolve_inpaint_backend(self.inpaint_backend, self.onnx_model)
+            lama = lama_identity(backend, onnx_model if backend == 'onnx' else torch_model_path(),
+                                 self.inpaint_precision)
+        return f"rapidocr-{ocr_version}|{lama}"
+
+    def emit(self, event, **fields):
+        """Send a structured progress event (a dict with an 'event' key) to progress_callback"""
+        if self.progress_callback is not None:
+            fields['event'] = event
+            fields.setdefault('file', self.current_file)
+            self.progress_callback(fields)
+
+    def cleanup_file(self):
+        """Memory cleanup after processing each file"""
+        # One full collection for the reference cycles pdfplumber/pdfminer leave behind;
+        # page rasters are reused through self.buffers, not left to the collector
+        gc.collect()
+
+        if not HAS_TORCH:
+            return
+
+        # Clear CUDA cache if using GPU
+        if self.is_gpu and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+            torch.cuda.synchronize()
+        
+        # Additional cleanup for CPU memory
+        if hasattr(torch, '_C') and hasattr(torch._C, '_cuda_clearCublasWorkspaces'):
+            try:
+                torch._C._cuda_clearCublasWorkspaces()
+            except:
+                pass
+
+    def classify_region(self, pixels, gray_gradient, comp, ring):
+        """Pick the cheapest solver for one masked region from its surrounding ring.
+
+        Returns (solver, fill) where fill holds the RGB values for the region's
+        pixels for the 'solid' and 'gradient' solvers.
+        """
+        if ring.sum() < REGION_MIN_RING_PIXELS:
+            return 'lama', None
+        values = pixels[ring].astype(np.float32)
+        if values.std(axis=0).max() <= REGION_FLAT_MAX_STD:
+            return 'solid', np.median(values, axis=0)
+
+        # Linear gradient: least-squares plane per channel over the ring coordinates
+        ry, rx = np.nonzero(ring)
+        coords = np.column_stack([rx, ry, np.ones_like(rx)]).astype(np.float32)
+        coef = np.linalg.lstsq(coords, values, rcond=None)[0]
+        if (values - coords @ coef).std(axis=0).max() <= REGION_FLAT_MAX_STD:
+            cy, cx = np.nonzero(comp)
+            return 'gradient', np.column_stack([cx, cy, np.ones_like(cx)]).astype(np.float32) @ coef
+
+        if (gray_gradient[ring].mean() <= REGION_CLASSIC_MAX_TEXTURE
+                and values.std(axis=0).max() <= REGION_CLASSIC_MAX_STD):
+            return 'classical', None
+        return 'lama', None
+
+    def solve_simple_regions(self, pixels, mask):
+        """Fill flat and low-texture masked regions in place, without the neural model.
+
+        Every connected mask region is classified from a ring of background
+        pixels around it: plain color or linear gradient fills, cv2.inpaint for
+        low-texture backgrounds. Returns the mask (narrowed in place) of the
+        regions that still need LaMa and the per-solver region counts.
+        """
+        counts = dict.fromkeys(REGION_SOLVERS, 0)
+        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if num_labels <= 1:
+            return mask, counts
+
+        height, width = mask.shape[:2]
+        # Light blur so scan / JPEG noise does not count as texture
+        gray = cv2.GaussianBlur(cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY), (5, 5), 0)
+        gradient = cv2.magnitude(cv2.Sobel(gray, cv2.CV_32F, 1, 0), cv2.Sobel(gray, cv2.CV_32F, 0, 1))
+        ring_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * REGION_RING_PX + 1,) * 2)
+        method = cv2.INPAINT_NS if REGION_CLASSIC_METHOD == 'ns' else cv2.INPAINT_TELEA
+        lama_labels = []
+
+        for label in range(1, num_labels):
+            x, y, w, h, _area = stats[label]
+            x0, y0 = max(0, x - REGION_RING_PX), max(0, y - REGION_RING_PX)
+            x1, y1 = min(width, x + w + REGION_RING_PX), min(height, y + h + REGION_RING_PX)
+            crop_mask = mask[y0:y1, x0:x1] > 0
+            comp = labels[y0:y1, x0:x1] == label
+            # Ring = dilated region minus any masked pixel (neighbouring text is not background)
+            ring = (cv2.dilate(comp.view(np.uint8), ring_kernel) > 0) & ~crop_mask
+            crop = pixels[y0:y1, x0:x1]
+
+            solver, fill = self.classify_region(crop, gradient[y0:y1, x0:x1], comp, ring)
+            counts[solver] += 1
+            if solver == 'lama':
+                lama_labels.append(label)
+            elif solver == 'classical':
+                # Inpaint every masked pixel of the crop so neighbouring text does not bleed in,
+                # but only keep this region's pixels
+                filled = cv2.inpaint(np.ascontiguousarray(crop), crop_mask.view(np.uint8), 3, method)
+                crop[comp] = filled[comp]
+            else:
+                crop[comp] = np.clip(fill, 0, 255).astype(np.uint8)
+
+        # Narrow the mask in place down to the regions left for LaMa
+        if not lama_labels:
+            mask[:] = 0
+        else:
+            mask[~np.isin(labels, lama_labels)] = 0
+        return mask, counts
+
+    def inpaint_regions(self, pixels, mask, defer=False):
+        """Erase the masked regions of an RGB array in place, using LaMa only where the background needs it.
+
+        Returns the cleaned array and a dict with the per-solver region counts
+        plus 'lama_calls', the number of LaMa calls made. The mask is narrowed
+        in place as regions get solved. An empty mask leaves the pixels
+        untouched without invoking any solver. With `defer` and batching
+        enabled, the array comes back as a PendingInpaint whose LaMa crops may
+        still be waiting for crops of later pages.
+        """
+        counts = dict.fromkeys(REGION_SOLVERS, 0)
+        counts['lama_calls'] = 0
+        if not mask.any():
+            return pixels, counts
+
+        if self.region_solver == 'auto':
+            mask, solved = self.solve_simple_regions(pixels, mask)
+            counts.update(solved)
+            if not mask.any():
+                return pixels, counts
+        else:
+            counts['lama'] = cv2.connectedComponents(mask, connectivity=8)[0] - 1
+
+        height, width = mask.shape[:2]
+        pad = self.roi_padding
+        num_labels, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        rois = []
+        for x, y, w, h, _area in stats[1:num_labels]:
+            rois.append((max(0, x - pad), max(0, y - pad), min(width, x + w + pad), min(height, y + h + pad)))
+        rois = merge_boxes(rois)
+
+        # Many scattered regions: one full-page pass is cheaper than lots of overlapping crops
+        roi_area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rois)
+        if roi_area >= self.roi_full_page_ratio * width * height:
+            rois = [[0, 0, width, height]]
+
+        counts['lama_calls'] = len(rois)
+        # ROIs are disjoint after merge_boxes, so each crop is read before any result lands in it.
+        # Only masked pixels are replaced, the rest of the raster stays bit-exact
+        crops = []
+        for x0, y0, x1, y1 in rois:
+            crop_mask = Image.fromarray(mask[y0:y1, x0:x1])
+            crop_image = Image.fromarray(pixels[y0:y1, x0:x1])
+            if self.batcher is not None:
+                crops.append((x0, y0, mask[y0:y1, x0:x1] > 0, self.batcher.submit(crop_image, crop_mask)))
+                continue
+            result = np.asarray(self.inpainter(crop_image, crop_mask))
+            np.copyto(pixels[y0:y1, x0:x1], result, where=(mask[y0:y1, x0:x1] > 0)[:, :, None])
+        if not crops:
+            return pixels, counts
+        pending = PendingInpaint(pixels, crops)
+        if defer:
+            return pending, counts
+        self.batcher.flush()
+        return pending.result(), counts
+
+    def encode_background(self, image, dpi):
+        """Encode a cleaned background in memory. Returns (bytes, file extension)"""
+        if self.output_dpi and self.output_dpi < dpi:
+            scale = self.output_dpi / dpi
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS)
+
+        buf = io.BytesIO()
+        fmt = self.image_format.lower()
+        if fmt in ('jpeg', 'jpg'):
+            (image if image.mode == 'RGB' else image.convert('RGB')).save(buf, format='JPEG',
+                                                                          quality=self.image_quality, optimize=True)
+            ext = 'jpg'
+        elif fmt == 'webp':
+            # Needs PowerPoint for Microsoft 365; older Office versions cannot show WebP
+            image.save(buf, format='WEBP', quality=self.image_quality, method=4)
+            ext = 'webp'
+        else:
+            image.save(buf, format='PNG', compress_level=self.png_compress_level)
+            ext = 'png'
+        return buf.getvalue(), ext
+
+    def build_text_blocks(self, ocr_result, dpi, polys=None):
+        """Convert OCR boxes (pixels) into editable text blocks (points)"""
+        if not ocr_result:
+            return []
+        if polys is None:
+            polys = polygon_array(ocr_result)
+        scale_factor = 72 / dpi
+        mins = polys.min(axis=1) * scale_factor
+        sizes = polys.max(axis=1) * scale_factor - mins
+        return [{
+            'text': text,
+            'x': float(x),
+            'y': float(y),
+            'w': float(w),
+            'h': float(h)
+        } for (_box, text, _score), (x, y), (w, h) in zip(ocr_result, mins, sizes) if text]
+
+    def extract_native_text(self, page, dpi):
+        """Read the embedded text layer of a born-digital page.
+
+        Returns None when the page has no usable text layer (scans, CID fonts without
+        a unicode map), in which case the whole page goes through OCR. Otherwise
+        returns a dict with:
+          'boxes':       OCR-style (box, text, score) line boxes in pixels, for the mask
+          'text_blocks': text blocks in points, with the real font size
+          'ocr_regions': pixel rects of embedded images with no text on top, which
+                         may still contain raster text and are OCR'd separately
+        """
+        chars = page.chars
+        if not chars:
+            return None
+        garbled = sum(1 for c in chars if c['text'].startswith('(cid:') or c['text'] == '\ufffd')
+        if garbled > len(chars) * NATIVE_TEXT_MAX_GARBLED:
+            return None
+
+        px = dpi / 72
+        ox, oy = page.bbox[0], page.bbox[1]
+        boxes = []
+        text_blocks = []
+        for line in page.extract_text_lines(return_chars=True):
+            text = line['text'].strip()
+            if not text:
+                continue
+            x0, x1 = line['x0'] - ox, line['x1'] - ox
+            top, bottom = line['top'] - oy, line['bottom'] - oy
+            sizes = sorted(c['size'] for c in line['chars'])
+            text_blocks.append({
+                'text': text,
+                'x': x0,
+                'y': top,
+                'w': x1 - x0,
+                'h': bottom - top,
+                'font_size': sizes[len(sizes) // 2] if sizes else (bottom - top) * 0.8
+            })
+            boxes.append(([[x0 * px, top * px], [x1 * px, top * px], [x1 * px, bottom * px], [x0 * px, bottom * px]], text, 1.0))
+
+        # Raster images without embedded text on top of them may still contain text
+        centers = [((c['x0'] + c['x1']) / 2 - ox, (c['top'] + c['bottom']) / 2 - oy) for c in chars]
+        ocr_regions = []
+        for img in page.images:
+            x0, x1 = max(img['x0'] - ox, 0), min(img['x1'] - ox, page.width)
+            top, bottom = max(img['top'] - oy, 0), min(img['bottom'] - oy, page.height)
+            if min(x1 - x0, bottom - top) * px < NATIVE_OCR_MIN_REGION_PX:
+                continue
+            if any(x0 <= cx <= x1 and top <= cy <= bottom for cx, cy in centers):
+                continue
+            ocr_regions.append((int(x0 * px), int(top * px), int(np.ceil(x1 * px)), int(np.ceil(bottom * px))))
+
+        return {'boxes': boxes, 'text_blocks': text_blocks, 'ocr_regions': merge_boxes(ocr_regions)}
+
+    def render_page(self, page, dpi, antialias=True):
+        """Render a pdfium page into an RGB array taken from the buffer pool.
+
+        pdfium writes straight into the pooled array (FPDF_REVERSE_BYTE_ORDER
+        turns its BGR into RGB), so no bitmap or PIL copy is made. antialias=False
+        matches pdfplumber's page.to_image() rendering.
+        """
+        arrays = []
 
-# --- Global Config ---
-DEFAULT_DPI = 250
+        def pooled_bitmap(width, height, format, rev_byteorder):
+            array = self.buffers.acquire((height, width, 3))
+            arrays.append(array)
+            buffer = (ctypes.c_ubyte * array.size).from_buffer(array)
+            return pdfium.PdfBitmap.new_native(width, height, format, rev_byteorder, buffer=buffer)
 
-# --- Conversion Logic (Refactored for GUI) ---
-class ConverterLogic:
-    def __init__(self, log_callback=print):
-        self.log = log_callback
-        self.stop_flag = False
-        self.ocr_engine = None
-        self.lama = None
-        self.is_gpu = False
-        self._initialized = False
-    
-    def initialize_models(self):
-        """Initialize OCR and LaMa models once for the entire batch"""
-        if self._initialized:
-            return True
-            
-        # Initialize OCR
-        try:
-            self.log("Initializing OCR engine...")
-            self.ocr_engine = RapidOCR()
-        except Exception as e:
-            self.log(f"Error initializing OCR: {e}")
-            return False
+        smooth_off = not antialias
+        bitmap = page.render(scale=dpi / 72, bitmap_maker=pooled_bitmap, rev_byteorder=True,
+                             force_bitmap_format=pdfium_c.FPDFBitmap_BGR, no_smoothtext=smooth_off,
+                             no_smoothpath=smooth_off, no_smoothimage=smooth_off)
+        bitmap.close()
+        return arrays[0]
 
-        # Initialize LaMa
+    def render_without_text(self, pdfium_doc, index, dpi):
+        """Render a page twice with pdfium: as is, and with its text objects removed.
+
+        Returns (original, stripped) pooled RGB arrays, or None when the page has no
+        text objects that can be removed. Only top-level text objects are removed; text
+        nested in form XObjects stays and is caught by residual_text_mask().
+        """
+        page = pdfium_doc[index]
         try:
-            self.log("Initializing LaMa AI model...")
-            self.is_gpu = False
-            if torch.cuda.is_available():
-                self.log(f"✅ GPU Detected: {torch.cuda.get_device_name(0)}")
-                self.is_gpu = True
-            else:
-                self.log("⚠️ GPU NOT Detected. Running on CPU (Slow Mode)")
-
-            # Bundle logic
-            if getattr(sys, 'frozen', False):
-                 model_path = os.path.join(sys._MEIPASS, 'big-lama.pt')
-                 self.log(f"Loading bundled model...")
-                 fake_home = os.path.join(sys._MEIPASS, 'torch_cache')
-                 if not os.path.exists(fake_home): os.makedirs(fake_home)
-                 checkpoint_dir = os.path.join(fake_home, 'hub', 'checkpoints')
-                 if not os.path.exists(checkpoint_dir): os.makedirs(checkpoint_dir)
-                 target_model = os.path.join(checkpoint_dir, 'big-lama.pt')
-                 if not os.path.exists(target_model):
-                     shutil.copy2(model_path, target_model)
-                 os.environ['TORCH_HOME'] = fake_home
-            
-            # Force CPU for SimpleLama load if no GPU is available or if we are in CPU mode
-            if not self.is_gpu:
-                 # Monkeypatch torch.jit.load (NOT torch.load) because SimpleLama uses JIT
-                 original_jit_load = torch.jit.load
-                 def safe_jit_load(*args, **kwargs):
-                     if 'map_location' not in kwargs:
-                         kwargs['map_location'] = torch.device('cpu')
-                     return original_jit_load(*args, **kwargs)
-                 torch.jit.load = safe_jit_load
-                 
-                 self.lama = SimpleLama()
-                 
-                 # Restore original load
-                 torch.jit.load = original_jit_load
-            else:
-                 self.lama = SimpleLama()
-                 
-            self.log("LaMa model loaded.")
-            self._initialized = True
-            return True
-        except Exception as e:
-            self.log(f"Error initializing LaMa: {e}")
-            # If LaMa fails, we can still try to proceed without it, or return False
-            # For now, let's return False to indicate a critical failure.
+            original = self.render_page(page, dpi)
+            if not self.strip_text_objects(page):
+                self.buffers.release(original)
+                return None
+            return original, self.render_page(page, dpi)
+        finally:
+            page.close()
+
+    def strip_text_objects(self, page):
+        """Remove the top-level text objects of a pdfium page. Returns False if it has none"""
+        text_objects = list(page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_TEXT], max_depth=1))
+        if not text_objects:
             return False
+        for obj in text_objects:
+            page.remove_obj(obj)
+        page.gen_content()
+        return True
 
-    def cleanup_file(self):
-        """Aggressive memory cleanup after processing each file"""
-        # Force Python garbage collection multiple times
-        for _ in range(3):
-            gc.collect()
-        
-        # Clear CUDA cache if using GPU
-        if self.is_gpu and torch.cuda.is_available():
-            torch.cuda.empty_cache()
-            torch.cuda.synchronize()
-        
-        # Additional cleanup for CPU memory
-        if hasattr(torch, '_C') and hasattr(torch._C, '_cuda_clearCublasWorkspaces'):
+    def render_tile(self, page, scale, size, rect):
+        """Render the pixel rect (x0, y0, x1, y1) of a pdfium page whose full render is `size`, as an RGB array"""
+        width, height = size
+        x0, y0, x1, y1 = rect
+        # pdfium rounds the crop margins (left, bottom, right, top) up to whole pixels:
+        # shave a hair off so they land exactly on the tile edges
+        crop = [max(0.0, (v - 0.01) / scale) for v in (x0, height - y1, width - x1, y0)]
+        return page.render(scale=scale, crop=crop, rev_byteorder=True).to_numpy()
+
+    def process_tiled_page(self, job, page, strip_page, dpi, dilation_size):
+        """OCR and clean a page too large to hold in memory at once, tile by tile.
+
+        Overlapping tiles are rendered with pdfium one at a time, OCR'd and inpainted
+        on their own, and written into a single pooled background canvas (at the
+        output DPI when it is lower), feathering each tile into its neighbours
+        across the overlap. Lines read by several tiles are stitched back together. Fills in
+        job.background, job.background_dpi, job.ocr_result and job.text_blocks.
+        """
+        scale = dpi / 72
+        width, height = int(np.ceil(page.get_width() * scale)), int(np.ceil(page.get_height() * scale))
+        out_dpi = self.output_dpi if self.output_dpi and self.output_dpi < dpi else dpi
+        out_scale = out_dpi / dpi
+        # Every pixel is written by the tile whose core covers it: no need to clear a reused buffer
+        canvas = self.buffers.acquire((max(1, round(height * out_scale)), max(1, round(width * out_scale)), 3))
+        job.buffers.append(canvas)
+        rows, cols = tile_spans(height), tile_spans(width)
+        self.log(f"  Page {job.index + 1}: {width * height / 1e6:.0f} MP above the {self.max_megapixels} MP cap, "
+                 f"processing {len(rows)}x{len(cols)} tiles.")
+
+        native = job.native
+        native_boxes = polygon_array(native['boxes']) if native and native['boxes'] else None
+        items = []
+        counts = dict.fromkeys(REGION_SOLVERS, 0)
+        counts['lama_calls'] = 0
+        for r, (cy0, cy1, y0, y1) in enumerate(rows):
+            for c, (cx0, cx1, x0, x1) in enumerate(cols):
+                if self.stop_flag:
+                    raise InterruptedError("Conversion stopped")
+                rect = (x0, y0, x1, y1)
+                offset = np.array([x0, y0], dtype=np.float32)
+                image = self.render_tile(page, scale, (width, height), rect)
+                stripped = self.render_tile(strip_page, scale, (width, height), rect) if strip_page else None
+                img_np = image
+
+                if native is None:
+                    result = self.run_ocr(img_np, dpi)
+                else:
+                    # Image regions are OCR'd by the tiles whose core they reach, never as thin
+                    # slivers of the overlap (RapidOCR upscales narrow crops at a high cost)
+                    regions = [(max(rx0, x0) - x0, max(ry0, y0) - y0, min(rx1, x1) - x0, min(ry1, y1) - y0)
+                               for rx0, ry0, rx1, ry1 in native['ocr_regions']
+                               if rx0 < cx1 and rx1 > cx0 and ry0 < cy1 and ry1 > cy0]
+                    result = self.ocr_regions(img_np, regions, dpi)
+                core = (cx0, cy0, cx1, cy1)
+                items.extend(((np.asarray(box, dtype=np.float32) + offset).tolist(), text, score, core, rect)
+                             for box, text, score in result)
+
+                mask_boxes = list(result)
+                if native_boxes is not None:
+                    lo, hi = native_boxes.min(axis=1), native_boxes.max(axis=1)
+                    hit = (lo[:, 0] < x1) & (hi[:, 0] > x0) & (lo[:, 1] < y1) & (hi[:, 1] > y0)
+                    mask_boxes += [((poly - offset).tolist(), '', 1.0) for poly in native_boxes[hit]]
+                mask = self.build_text_mask(img_np.shape[:2], mask_boxes, dilation_size)
+                if stripped is not None:
+                    mask = self.residual_text_mask(mask, image, stripped)
+                cleaned, solved = self.inpaint_regions(stripped if stripped is not None else image, mask)
+                for name, value in solved.items():
+                    counts[name] += value
+
+                # Tile rect on the canvas; the canvas already holds the rows above and the tile to the left
+                ox0, oy0 = round(x0 * out_scale), round(y0 * out_scale)
+                ox1, oy1 = round(x1 * out_scale), round(y1 * out_scale)
+                tile = cleaned
+                if out_scale != 1.0:
+                    tile = cv2.resize(tile, (ox1 - ox0, oy1 - oy0), interpolation=cv2.INTER_AREA)
+                done_y = round(rows[r - 1][3] * out_scale) - oy0 if r else 0
+                done_x = round(cols[c - 1][3] * out_scale) - ox0 if c else 0
+                target = canvas[oy0:oy1, ox0:ox1]
+                target[done_y:, done_x:] = tile[done_y:, done_x:]
+                # Feather across the overlap: linear ramps from the old pixels to this tile's
+                ramp_y = np.ones(oy1 - oy0, dtype=np.float32)
+                ramp_y[:done_y] = (np.arange(done_y, dtype=np.float32) + 0.5) / max(done_y, 1)
+                ramp_x = np.ones(ox1 - ox0, dtype=np.float32)
+                ramp_x[:done_x] = (np.arange(done_x, dtype=np.float32) + 0.5) / max(done_x, 1)
+                for band_rows, band_cols in ((slice(0, done_y), slice(None)), (slice(done_y, None), slice(0, done_x))):
+                    weight = np.outer(ramp_y[band_rows], ramp_x[band_cols])[:, :, None]
+                    if not weight.size:
+                        continue
+                    old = target[band_rows, band_cols]
+                    target[band_rows, band_cols] = old + (tile[band_rows, band_cols].astype(np.float32) - old) * weight + 0.5
+                del image, stripped, img_np, mask, cleaned, tile, target
+
+        job.ocr_result = stitch_tile_lines(items)
+        native_blocks = native['text_blocks'] if native else []
+        job.text_blocks = native_blocks + self.build_text_blocks(job.ocr_result, dpi)
+        job.background = canvas
+        job.background_dpi = out_dpi
+        if any(counts[name] for name in REGION_SOLVERS):
+            self.log(f"  Page {job.index + 1}: regions solid={counts['solid']} gradient={counts['gradient']} "
+                     f"classical={counts['classical']} lama={counts['lama']} (LaMa calls: {counts['lama_calls']})")
+            self.emit('regions', page=job.index + 1, **counts)
+        if self.metrics:
+            self.metrics.page(job.index + 1, from_cache=False, tiles=len(rows) * len(cols),
+                              ocr_boxes=len(job.ocr_result), native_lines=len(native_blocks), **counts)
+
+    def residual_text_mask(self, mask, original, stripped):
+        """Drop (in place) the mask regions that text-stripped rendering already cleaned.
+
+        A masked region whose pixels did not change when the text objects were
+        removed holds raster text (scans, images, invisible OCR layers, text in
+        form XObjects) and is kept for inpainting.
+        """
+        num_labels, labels = cv2.connectedComponents(mask, connectivity=8)
+        if num_labels <= 1:
+            return mask
+        diff = cv2.absdiff(np.asarray(original), np.asarray(stripped))
+        changed = diff.reshape(diff.shape[0], diff.shape[1], -1).max(axis=2) > STRIP_DIFF_THRESHOLD
+        area = np.bincount(labels.ravel(), minlength=num_labels)
+        changed_count = np.bincount(labels[changed], minlength=num_labels)
+        keep = changed_count < area * STRIP_MIN_CHANGED_RATIO
+        keep[0] = False
+        mask[~keep[labels]] = 0
+        return mask
+
+    def run_ocr(self, img_np, dpi, skip_zone=None, templates=None):
+        """OCR a raster rendered at `dpi`, detecting text at the lower ocr_dpi.
+
+        Boxes are mapped back to the full-resolution coordinates. Lines that are
+        small in the detection image are recognized again from full-resolution
+        crops and keep whichever reading scores higher. Returns a list of
+        (box, text, score); text is empty when recognition is disabled.
+        Lines detected entirely inside the `skip_zone` tiles of `templates` are
+        dropped before recognition (the caller already has their text).
+        """
+        height, width = img_np.shape[:2]
+        scale = self.ocr_dpi / dpi if self.ocr_dpi and self.ocr_dpi < dpi else 1.0
+        det_img = img_np
+        if scale < 1.0:
+            det_img = cv2.resize(img_np, (max(1, round(width * scale)), max(1, round(height * scale))),
+                                 interpolation=cv2.INTER_AREA)
+        if skip_zone is not None and self.ocr_use_det and self.ocr_use_rec:
+            result = self.recognize_outside(det_img, (width, height), skip_zone, templates)
+        else:
+            result, _ = self.ocr_engine(det_img, use_det=self.ocr_use_det, use_cls=self.ocr_use_cls,
+                                        use_rec=self.ocr_use_rec)
+        if not result:
+            return []
+
+        # Normalize the shapes RapidOCR returns when a stage is switched off
+        if not self.ocr_use_det:
+            whole = [[0, 0], [det_img.shape[1], 0], [det_img.shape[1], det_img.shape[0]], [0, det_img.shape[0]]]
+            result = [(whole, text, score) for text, score in result]
+        elif not self.ocr_use_rec:
+            result = [(box, '', 1.0) for box in result]
+        if scale == 1.0:
+            return [tuple(item) for item in result]
+
+        sx, sy = det_img.shape[1] / width, det_img.shape[0] / height
+        polys = polygon_array(result)
+        full_polys = polys / np.array([sx, sy], dtype=np.float32)
+        ocr_result = [(poly.tolist(), text, score) for poly, (_box, text, score) in zip(full_polys, result)]
+        if not (self.ocr_use_det and self.ocr_use_rec):
+            return ocr_result
+
+        det_heights = polys[:, :, 1].max(axis=1) - polys[:, :, 1].min(axis=1)
+        small = np.flatnonzero(det_heights < self.ocr_small_text_px)
+        if not len(small):
+            return ocr_result
+        crops = [crop_text_box(img_np, full_polys[i]) for i in small]
+        if self.ocr_use_cls:
+            crops, _, _ = self.ocr_engine.text_cls(crops)
+        readings, _ = self.ocr_engine.text_rec(crops)
+        for i, reading in zip(small, readings):
+            text, score = reading[0], reading[1]
+            if score > ocr_result[i][2]:
+                ocr_result[i] = (ocr_result[i][0], text, score)
+        return ocr_result
+
+    def recognize_outside(self, det_img, full_size, zone, templates):
+        """RapidOCR's detect -> classify -> recognize, skipping lines inside the zone"""
+        boxes, _ = self.ocr_engine(det_img, use_det=True, use_cls=False, use_rec=False)
+        if not boxes:
+            return []
+        polys = polygon_array([(box, '', 0) for box in boxes])
+        scale = np.array([full_size[0] / det_img.shape[1], full_size[1] / det_img.shape[0]], dtype=np.float32)
+        outside = ~templates.inside_mask(polys * scale, zone)
+        polys = polys[outside]
+        if not len(polys):
+            return []
+        crops = [crop_text_box(det_img, poly) for poly in polys]
+        if self.ocr_use_cls:
+            crops, _, _ = self.ocr_engine.text_cls(crops)
+        readings, _ = self.ocr_engine.text_rec(crops)
+        min_score = self.ocr_engine.text_score
+        return [(poly.tolist(), reading[0], reading[1]) for poly, reading in zip(polys, readings)
+                if reading[1] >= min_score]
+
+    def ocr_with_template(self, img_np, dpi, templates, ref, zone, regions=None):
+        """OCR a page whose `zone` tiles are identical to the reference page `ref`.
+
+        Lines inside the zone are taken from the reference and are not recognized
+        again. For born-digital pages, image regions inside the zone are skipped.
+        """
+        reused, _ = templates.boxes_inside(ref.ocr_result, zone)
+        if regions is not None:
+            regions = [r for r in regions if not templates.rect_inside(r, zone)]
+            fresh = templates.boxes_inside(self.ocr_regions(img_np, regions, dpi), zone)[1]
+        else:
+            fresh = self.run_ocr(img_np, dpi, skip_zone=zone, templates=templates)
+        return reused + fresh
+
+    def ocr_regions(self, img_np, regions, dpi):
+        """OCR only the given pixel rects of a page, returning boxes in page coordinates"""
+        ocr_result = []
+        for x0, y0, x1, y1 in regions:
+            result = self.run_ocr(np.ascontiguousarray(img_np[y0:y1, x0:x1]), dpi)
+            for box, text, score in result:
+                ocr_result.append(([[x + x0, y + y0] for x, y in box], text, score))
+        return ocr_result
+
+    def build_text_mask(self, shape, ocr_result, dilation_size, polys=None):
+        """Build the inpainting mask from OCR boxes.
+
+        All polygons are expanded in one NumPy batch. Each text line is dilated
+        according to its own height instead of the page average: lines are grouped
+        into kernel size buckets, and each bucket is rasterized with a single
+        fillPoly call and dilated once, only inside its own bounding rect.
+        """
+        mask = np.zeros(shape, dtype=np.uint8)
+        if not ocr_result:
+            return mask
+        if polys is None:
+            polys = polygon_array(ocr_result)
+
+        # Expand the polygons slightly (10%) around their center to cover edges/punctuation
+        centers = polys.mean(axis=1, keepdims=True)
+        expanded = (centers + (polys - centers) * 1.10).astype(np.int32)
+
+        # Adaptive dilation per line: larger text needs more "bleed" to erase effectively,
+        # small text must not take its neighbours with it. The kernel follows the line height,
+        # dilation_size scales it, and kernels above MASK_KERNEL_STEP are rounded up to a
+        # multiple of it to keep the number of buckets small
+        heights = polys[:, :, 1].max(axis=1) - polys[:, :, 1].min(axis=1)
+        ratio = MASK_DILATION_RATIO * dilation_size / MASK_REFERENCE_DILATION
+        kernels = np.clip(np.ceil(heights * ratio).astype(np.int32), MASK_MIN_KERNEL_PX, MASK_MAX_KERNEL_PX)
+        kernels = np.where(kernels > MASK_KERNEL_STEP, -(-kernels // MASK_KERNEL_STEP) * MASK_KERNEL_STEP, kernels)
+
+        # Optimization: Morphological CLOSE to connect nearby characters
+        kernel_close = np.ones((5, 5), np.uint8)
+        height, width = shape
+        for size in np.unique(kernels):
+            bucket = expanded[kernels == size]
+            # Bounding rect of this bucket, grown by the kernel reach
+            x0 = int(max(0, bucket[:, :, 0].min() - size))
+            y0 = int(max(0, bucket[:, :, 1].min() - size))
+            x1 = int(min(width, bucket[:, :, 0].max() + size + 1))
+            y1 = int(min(height, bucket[:, :, 1].max() + size + 1))
+            if x0 >= x1 or y0 >= y1:
+                continue
+            layer = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+            cv2.fillPoly(layer, bucket - np.array([x0, y0], dtype=np.int32), 255)
+            cv2.morphologyEx(layer, cv2.MORPH_CLOSE, kernel_close, dst=layer)
+            # Apply Final Dilation
+            cv2.dilate(layer, np.ones((size, size), np.uint8), dst=layer, iterations=1)
+            np.bitwise_or(mask[y0:y1, x0:x1], layer, out=mask[y0:y1, x0:x1])
+        return mask
+
+    def release_buffers(self, job):
+        """Hand a page's pooled rasters back once nothing reads them anymore"""
+        for array in job.buffers:
+            self.buffers.release(array)
+        job.buffers = []
+        job.image = job.stripped = None
+
+    def run_pipeline(self, source, stages, sink):
+        """Run page jobs through a chain of stages, one worker thread per stage.
+
+        `source` is a generator-producing function executed on its own thread (the
+        first stage), each (name, func) in `stages` is applied to every job on a dedicated
+        thread, and `sink` is called on the calling thread. Stages are connected by
+        bounded queues so at most a few pages are in flight, and since every stage
+        has a single worker, jobs reach `sink` in the order `source` produced them.
+        A job that failed in one stage carries the exception in `job.error` and
+        skips the remaining stages, as does a job restored from a checkpoint. `stop_flag` stops the source and drains the rest.
+        An exception from `sink` does the same, since later jobs would land out of
+        place, and is raised once the pipeline has drained.
+        """
+        queues = [queue.Queue(maxsize=PIPELINE_QUEUE_SIZE) for _ in range(len(stages) + 1)]
+        sink_error = None
+
+        def run_source():
             try:
-                torch._C._cuda_clearCublasWorkspaces()
-            except:
-                pass
+                for job in source():
+                    queues[0].put(job)
+                    if self.stop_flag or sink_error is not None:
+                        break
+            except Exception as e:
+                self.log(f"Error reading pages: {e}")
+            finally:
+                queues[0].put(None)
+
+        def run_stage(name, func, in_q, out_q):
+            while True:
+                job = in_q.get()
+                if job is None:
+                    out_q.put(None)
+                    return
+                if job.error is None and not job.restored and not self.stop_flag and sink_error is None:
+                    metrics = self.metrics
+                    cpu_start = time.thread_time() if metrics else 0
+                    start = time.perf_counter()
+                    try:
+                        func(job)
+                    except Exception as e:
+                        job.error = e
+                    wall = time.perf_counter() - start
+                    if metrics:
+                        metrics.stage(job.index + 1, name, wall, time.thread_time() - cpu_start)
+                    self.emit('stage', stage=name, page=job.index + 1, seconds=round(wall, 4))
+                    # A page whose LaMa crops are batched reports its inpainting time once they are done
+                    if self.resources is not None and job.pending is None:
+                        self.resources.observe(name, wall)
+                out_q.put(job)
+
+        threads = [threading.Thread(target=run_source, daemon=True)]
+        for n, (name, func) in enumerate(stages):
+            threads.append(threading.Thread(target=run_stage, args=(name, func, queues[n], queues[n + 1]), daemon=True))
+        for t in threads:
+            t.start()
+
+        # Keep draining even after a stop so that no worker stays blocked on a full queue
+        while True:
+            job = queues[-1].get()
+            if job is None:
+                break
+            if not self.stop_flag and sink_error is None:
+                metrics = self.metrics
+                cpu_start = time.thread_time() if metrics else 0
+                start = time.perf_counter()
+                try:
+                    sink(job)
+                except Exception as e:
+                    sink_error = e
+                wall = time.perf_counter() - start
+                if metrics:
+                    metrics.stage(job.index + 1, 'write', wall, time.thread_time() - cpu_start)
+                self.emit('stage', stage='write', page=job.index + 1, seconds=round(wall, 4))
+
+        for t in threads:
+            t.join()
+        if sink_error is not None:
+            raise sink_error
+
+    def worker_options(self):
+        """Constructor options for worker processes that convert with the same settings"""
+        return {
+            'roi_padding': self.roi_padding, 'roi_full_page_ratio': self.roi_full_page_ratio,
+            'cache_dir': self.cache.cache_dir if self.cache else None,
+            'cache_size_mb': self.cache.max_bytes // (1024 * 1024) if self.cache else DEFAULT_CACHE_SIZE_MB,
+            'native_text': self.native_text, 'background_mode': self.background_mode,
+            'image_format': self.image_format, 'image_quality': self.image_quality,
+            'png_compress_level': self.png_compress_level, 'output_dpi': self.output_dpi,
+            'inpaint_backend': self.inpaint_backend, 'onnx_model': self.onnx_model,
+            'inpaint_precision': self.inpaint_precision,
+            'lama_batch_size': self.lama_batch_size, 'lama_batch_wait_ms': self.lama_batch_wait_ms,
+            'ort_intra_threads': self.ort_intra_threads, 'ort_inter_threads': self.ort_inter_threads,
+            'region_solver': self.region_solver, 'ocr_dpi': self.ocr_dpi,
+            'ocr_small_text_px': self.ocr_small_text_px, 'ocr_use_det': self.ocr_use_det,
+            'ocr_use_cls': self.ocr_use_cls, 'ocr_use_rec': self.ocr_use_rec,
+            'template_reuse': self.template_reuse, 'max_megapixels': self.max_megapixels,
+            'job_dir': self.job_dir, 'cores': self.cores,
+            # Page workers measure their pages for the parent's metrics (files and hook stay with the parent)
+            'metrics': bool(self.metrics_enabled or self.metrics_hook),
+        }
+
+    def checkpoint_settings(self, dpi, dilation_size):
+        """Every option that changes the slides; checkpoints are only reused when they all match.
+
+        The models are identified from the configuration rather than the loaded
+        models, so page workers that have not loaded theirs yet agree with the
+        parent on the directory.
+        """
+        ignored = ('cache_dir', 'cache_size_mb', 'ort_intra_threads', 'ort_inter_threads', 'job_dir',
+                   'lama_batch_wait_ms', 'cores', 'metrics')
+        settings = {k: v for k, v in self.worker_options().items() if k not in ignored}
+        settings.update(dpi=dpi, dilation_size=dilation_size, models=self.model_identity(loaded=False))
+        return settings
+
+    def convert_shards(self, pdf_path, pptx_path, job_root, todo, dpi, dilation_size, debug_mode=False):
+        """Convert the `todo` pages of one PDF on page_workers processes, into the job directory.
+
+        Pages are split into contiguous ranges (so template reuse still works
+        inside each range), a few per worker to even out slow pages. Each worker
+        opens the PDF on its own and stores its pages as checkpoints.
+        """
+        count = min(len(todo), self.page_workers * SHARDS_PER_PAGE_WORKER)
+        bounds = [round(k * len(todo) / count) for k in range(count + 1)]
+        shards = [todo[a:b] for a, b in zip(bounds, bounds[1:])]
+        options = self.worker_options()
+        if self.page_pool is not None and self.page_pool.converter_options != options:
+            # Settings changed since the workers loaded: they would convert with the old ones
+            self.close_page_workers()
+        if self.page_pool is None:
+            def on_progress(worker_id, event):
+                if event.get('event') == 'shard_metrics':
+                    if self.metrics is not None:
+                        self.metrics.merge(event['stages'], event['pages'], page_worker=worker_id)
+                elif event.get('event') not in ('file_start', 'metrics') and self.progress_callback:
+                    self.progress_callback(dict(event, worker=worker_id))
+
+            self.page_pool = BatchExecutor(self.page_workers, log_callback=self.log,
+                                           progress_callback=on_progress, converter_options=options)
+        executor = self.page_pool
+        done = threading.Event()
+
+        def watch_stop():
+            while not done.wait(0.2):
+                if self.stop_flag:
+                    executor.stop()
+                    return
+        threading.Thread(target=watch_stop, daemon=True).start()
+        self.log(f"Splitting {len(todo)} pages into {len(shards)} ranges...")
+        try:
+            return executor.run([(pdf_path, pptx_path, pages, job_root) for pages in shards],
+                                dpi, dilation_size, debug_mode)
+        finally:
+            done.set()
+
+    def close_page_workers(self):
+        """Let the page worker processes exit; the next split file starts new ones"""
+        if self.page_pool is not None:
+            self.page_pool.close()
+            self.page_pool = None
+
+    def convert(self, pdf_path, pptx_path, dpi, dilation_size, debug_mode=False, pages=None):
+        """Convert one PDF into pptx_path. Returns True on success.
 
-    def convert(self, pdf_path, pptx_path, dpi, dilation_size, debug_mode=False):
+        With `pages` (page indices) only those pages are converted into the job
+        directory and no .pptx is written: this is one shard of a conversion
+        split across page_workers processes.
+        """
         self.log(f"Starting Conversion...")
         self.log(f"Input: {pdf_path}")
         self.log(f"Output: {pptx_path}")
         self.log(f"Quality: {dpi} DPI")
         self.log(f"Cleaner Strength: {dilation_size}")
         self.log(f"Debug Mode: {'ON' if debug_mode else 'OFF'}")
-        
-        # Ensure models are initialized
-        if not self._initialized:
+        self.current_file = pdf_path
+        sharded = pages is None and self.page_workers > 1
+
+        # Ensure models are initialized (page workers load their own)
+        if not self._initialized and not sharded:
             if not self.initialize_models():
                 return False
 
@@ -126,144 +2513,1216 @@ class ConverterLogic:
             pdf_file = pdfplumber.open(pdf_path)
             total_pages = len(pdf_file.pages)
             self.log(f"Total pages: {total_pages}")
+            self.emit('file_start', file=pdf_path, total_pages=total_pages)
         except Exception as e:
             self.log(f"Error opening PDF: {e}")
             return False
 
-        prs = Presentation()
-        
-        with tempfile.TemporaryDirectory() as temp_dir:
+        # pdfium renders every page into pooled buffers; pages with a text layer may get their
+        # text objects removed from this document (text-stripped backgrounds)
+        pdfium_doc = None
+        strip_text = self.background_mode == 'auto' and self.native_text
+        if HAS_PDFIUM:
+            try:
+                pdfium_doc = pdfium.PdfDocument(pdf_path)
+            except Exception as e:
+                self.log(f"pdfium rendering unavailable, using pdfplumber and inpainting only: {e}")
+        elif strip_text:
+            self.log("pypdfium2 not installed, using inpainting only.")
+        pool_start = (self.buffers.allocated, self.buffers.reused)
+
+        # Tiled pages render crops of an untouched copy, since pdfium_doc pages get their text removed
+        tile_doc = None
+
+        checkpoint = None
+        finished = set()
+        # Page workers hand their pages over through checkpoints, in a temporary directory if needed
+        temp_root = tempfile.mkdtemp(prefix="pdf2pptx-") if sharded and not self.job_dir else None
+        job_root = self.job_dir or temp_root
+        if job_root:
+            try:
+                checkpoint = JobCheckpoint(job_root, pdf_path, self.checkpoint_settings(dpi, dilation_size))
+                finished = checkpoint.finished()
+            except OSError as e:
+                self.log(f"Checkpoints disabled, cannot use job directory: {e}")
+            if finished and pages is None:
+                self.log(f"Resuming: {len(finished)}/{total_pages} pages already done in {checkpoint.path}")
+        if pages is not None:
+            pages = set(pages)
+            if checkpoint is None:
+                self.log("Error: converting a page range needs a job directory.")
+                pdf_file.close()
+                return False
+
+        debug_dir = pptx_path.replace(".pptx", "_debug_images") if debug_mode else None
+        writer = None
+        templates = TemplateStore() if self.template_reuse else None
+        if self.metrics_enabled or self.metrics_hook:
+            self.metrics = ConversionMetrics(pdf_path, dpi, use_gpu=self.is_gpu)
+
+        # Pages done by an earlier run; pages the workers convert now bring their own metrics
+        resumed = set(finished)
+        if sharded and checkpoint is not None:
+            todo = [i for i in range(total_pages) if i not in finished]
+            if len(todo) > 1:
+                start = time.perf_counter()
+                self.convert_shards(pdf_path, pptx_path, job_root, todo, dpi, dilation_size, debug_mode)
+                finished = checkpoint.finished()
+                if self.metrics:
+                    self.metrics.extra['shards_s'] = round(time.perf_counter() - start, 4)
+        if len(finished) < total_pages and not self._initialized and not self.stop_flag:
+            # Pages left over by the workers (or a document too short to split) are converted here
+            if not self.initialize_models():
+                pdf_file.close()
+                if temp_root:
+                    shutil.rmtree(temp_root, ignore_errors=True)
+                return False
+        if self.resources is not None and self._initialized:
+            # Shares moved during earlier files: resize the onnxruntime sessions now, between files
+            self.apply_threads(rebuild=True)
+
+        # Stage 1 (source): rasterize. Only this thread touches the PDF.
+        def render_pages():
+            nonlocal tile_doc
             for i, page in enumerate(pdf_file.pages):
                 if self.stop_flag:
-                    self.log("Conversion Stopped by User.")
-                    return False
-                    
+                    return
+                if pages is not None and i not in pages:
+                    continue
+                self.rebalance_threads()
+                if i in finished:
+                    job = checkpoint.load(i)
+                    if job is not None:
+                        if self.metrics and i in resumed:
+                            self.metrics.page(i + 1, restored=True)
+                        yield job
+                        continue
                 self.log(f"Processing page {i + 1}/{total_pages}...")
-                
+                job = PageJob(i, page.width, page.height)
+                metrics = self.metrics
+                cpu_start = time.thread_time() if metrics else 0
+                start = time.perf_counter()
+                stage = 'render'
                 try:
-                    pdf_width_pt = page.width
-                    pdf_height_pt = page.height
-                    
-                    if i == 0:
-                        prs.slide_width = Pt(pdf_width_pt)
-                        prs.slide_height = Pt(pdf_height_pt)
-                    
-                    blank_slide_layout = prs.slide_layouts[6] 
-                    slide = prs.slides.add_slide(blank_slide_layout)
-
-                    page_image_obj = page.to_image(resolution=dpi)
-                    pil_image = page_image_obj.original
-                    img_np = np.array(pil_image)
-                    
-                    mask = np.zeros(img_np.shape[:2], dtype=np.uint8)
-                    ocr_result, _ = self.ocr_engine(img_np)
-                    
-                    text_blocks = []
-                    box_heights = []
-                    scale_factor = 72 / dpi
-                    
-                    if ocr_result:
-                        for item in ocr_result:
-                            box, text, score = item
-                            
-                            # Expand the polygon slightly (5-10%) to cover edges/punctuation
-                            poly = np.array(box, dtype=np.float32)
-                            center = np.mean(poly, axis=0)
-                            # Expansion vector: (Point - Center) * Scale + Center
-                            expanded_poly = center + (poly - center) * 1.10
-                            
-                            pts = expanded_poly.astype(np.int32).reshape((-1, 1, 2))
-                            cv2.fillPoly(mask, [pts], 255)
-                            
-                            xs = [p[0] for p in box]
-                            ys = [p[1] for p in box]
-                            text_blocks.append({
-                                'text': text,
-                                'x': min(xs) * scale_factor, 
-                                'y': min(ys) * scale_factor, 
-                                'w': (max(xs) - min(xs)) * scale_factor, 
-                                'h': (max(ys) - min(ys)) * scale_factor
-                            })
-                            
-                            # Collect height for adaptive dilation
-                            h_px = max(ys) - min(ys)
-                            box_heights.append(h_px)
-                        
-                        # Adaptive Dilation Calculation
-                        # Instead of a fixed global kernel, we compute it based on the text size.
-                        # Logic: Larger text needs more "bleed" to erase effectively.
-                        if box_heights:
-                            avg_height = sum(box_heights) / len(box_heights)
-                            # Heuristic: 20% of text height, clamped between 15 and 40
-                            adaptive_dil = int(avg_height * 0.20)
-                            adaptive_dil = max(15, min(adaptive_dil, 40))
-                            
-                            # If manual override is significantly different, maybe use that? 
-                            # But user said "I don't want to tune". So let's use the Dynamic value 
-                            # unless the user explicitly changed the slider from default in a future version.
-                            # For now, we mix them: Max(Manual, Adaptive) to be safe.
-                            final_dil = max(dilation_size, adaptive_dil)
-                        else:
-                            final_dil = dilation_size
-
-                        # Optimization: Morphological CLOSE to connect nearby characters
-                        kernel_close = np.ones((5, 5), np.uint8)
-                        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel_close)
-
-                        # Apply Final Dilation
-                        kernel = np.ones((final_dil, final_dil), np.uint8)
-                        mask = cv2.dilate(mask, kernel, iterations=1)
-                    
-                    mask_pil = Image.fromarray(mask)
-                    with torch.no_grad():
-                        cleaned_image_pil = self.lama(pil_image, mask_pil)
-                    
-                    bg_image_path = os.path.join(temp_dir, f"bg_page_{i}.png")
-                    cleaned_image_pil.save(bg_image_path)
-                    
-                    # Debug Mode: Export Clean Background
-                    if debug_mode:
-                        debug_dir = pptx_path.replace(".pptx", "_debug_images")
-                        if not os.path.exists(debug_dir):
-                            os.makedirs(debug_dir, exist_ok=True)
-                        debug_save_path = os.path.join(debug_dir, f"page_{i+1}_clean_bg.png")
-                        cleaned_image_pil.save(debug_save_path)
-                        
-                    slide.shapes.add_picture(bg_image_path, Pt(0), Pt(0), width=Pt(pdf_width_pt), height=Pt(pdf_height_pt))
-                    
-                    for block in text_blocks:
+                    if self.native_text:
+                        job.native = self.extract_native_text(page, dpi)
+                    megapixels = (page.width * dpi / 72) * (page.height * dpi / 72) / 1e6
+                    if self.max_megapixels and megapixels > self.max_megapixels and HAS_PDFIUM:
+                        # Render, OCR and inpaint tile by tile; the next stages only encode
+                        stage = 'tiled'
+                        if tile_doc is None:
+                            tile_doc = pdfium.PdfDocument(pdf_path)
+                        tile_page = tile_doc[i]
+                        strip_page = None
+                        if job.native is not None and pdfium_doc is not None and strip_text:
+                            strip_page = pdfium_doc[i]
+                            if not self.strip_text_objects(strip_page):
+                                strip_page.close()
+                                strip_page = None
                         try:
-                            txBox = slide.shapes.add_textbox(Pt(block['x']), Pt(block['y']), Pt(block['w']), Pt(block['h']))
-                            tf = txBox.text_frame
-                            tf.word_wrap = True
-                            tf.text = block['text']
-                            if block['h'] > 0:
-                                tf.paragraphs[0].font.size = Pt(block['h'] * 0.8)
-                        except:
-                            pass
-                    
-                    del page_image_obj, pil_image, img_np, mask, mask_pil, cleaned_image_pil
-                    if self.is_gpu: torch.cuda.empty_cache()
-                    gc.collect()
-                    
+                            self.process_tiled_page(job, tile_page, strip_page, dpi, dilation_size)
+                        finally:
+                            tile_page.close()
+                            if strip_page is not None:
+                                strip_page.close()
+                    elif job.native is not None and pdfium_doc is not None and strip_text:
+                        rendered = self.render_without_text(pdfium_doc, i, dpi)
+                        if rendered:
+                            job.image, job.stripped = rendered
+                            job.buffers.extend(rendered)
+                    if job.image is None and job.background is None:
+                        if pdfium_doc is not None:
+                            pdfium_page = pdfium_doc[i]
+                            try:
+                                job.image = self.render_page(pdfium_page, dpi, antialias=False)
+                            finally:
+                                pdfium_page.close()
+                            job.buffers.append(job.image)
+                        else:
+                            job.image = np.array(page.to_image(resolution=dpi).original)
                 except Exception as e:
-                    self.log(f"Error processing page {i}: {e}")
+                    job.error = e
+                wall = time.perf_counter() - start
+                if metrics:
+                    metrics.stage(i + 1, stage, wall, time.thread_time() - cpu_start)
+                self.emit('stage', stage=stage, page=i + 1, seconds=round(wall, 4))
+                yield job
+
+        # Stage 2: OCR + mask (or a cache hit, which also provides the background)
+        # Born-digital pages take their text from the PDF and only OCR embedded images
+        def ocr_page(job):
+            if job.background is not None:
+                return
+            native = job.native
+            native_blocks = native['text_blocks'] if native else []
+            if self.cache:
+                job.cache_key = self.cache.make_key(job.image, dpi, dilation_size, self.roi_padding,
+                                                    self.roi_full_page_ratio, self.model_id, native is not None,
+                                                    self.region_solver, job.stripped is not None, self.ocr_dpi,
+                                                    self.ocr_small_text_px, self.ocr_use_det, self.ocr_use_cls,
+                                                    self.ocr_use_rec, self.template_reuse, self.lama_batch_size > 1,
+                                                    stripped=job.stripped)
+                cached = self.cache.get(job.cache_key)
+                if cached:
+                    job.ocr_result, job.background = cached
+                    job.from_cache = True
+                    job.text_blocks = native_blocks + self.build_text_blocks(job.ocr_result, dpi)
+                    job.image = job.stripped = None
+                    self.release_buffers(job)
+                    self.log(f"  Page {job.index + 1}: loaded from cache.")
+                    if self.metrics:
+                        self.metrics.page(job.index + 1, from_cache=True, ocr_boxes=len(job.ocr_result or []),
+                                          native_lines=len(native_blocks))
+                    return
+            img_np = job.image
+            ref = zone = None
+            if templates is not None:
+                rasters = [img_np] if job.stripped is None else [img_np, job.stripped]
+                hashes = templates.tile_hashes(*rasters)
+                ref, zone = templates.match(hashes)
+            regions = native['ocr_regions'] if native else None
+            if native is not None:
+                self.log(f"  Page {job.index + 1}: using embedded text ({len(native_blocks)} lines, "
+                         f"{len(native['ocr_regions'])} image regions to OCR).")
+            if ref is not None:
+                job.ocr_result = self.ocr_with_template(img_np, dpi, templates, ref, zone, regions)
+                job.template_ref, job.template_zone = ref, zone
+                self.log(f"  Page {job.index + 1}: reusing {int(zone.sum())}/{zone.size} tiles of page {ref.index + 1}.")
+            elif native is None:
+                job.ocr_result = self.run_ocr(img_np, dpi)
+            else:
+                job.ocr_result = self.ocr_regions(img_np, regions, dpi)
+            if templates is not None and (ref is None or zone.mean() < TEMPLATE_NEW_REF_RATIO):
+                job.template_out = templates.add(job.index, hashes, job.ocr_result)
+            mask_boxes = job.ocr_result if native is None else native['boxes'] + job.ocr_result
+            # One polygon array feeds both the text block geometry and the mask
+            polys = polygon_array(mask_boxes)
+            ocr_polys = polys[len(mask_boxes) - len(job.ocr_result or []):]
+            job.text_blocks = native_blocks + self.build_text_blocks(job.ocr_result, dpi, ocr_polys)
+            job.mask = self.build_text_mask(img_np.shape[:2], mask_boxes, dilation_size, polys)
+            if job.stripped is not None:
+                job.mask = self.residual_text_mask(job.mask, job.image, job.stripped)
+            if self.metrics:
+                self.metrics.page(job.index + 1, from_cache=False, ocr_boxes=len(job.ocr_result or []),
+                                  native_lines=len(native_blocks),
+                                  template_tiles=int(zone.sum()) if zone is not None else 0,
+                                  mask_coverage_pct=round(100 * cv2.countNonZero(job.mask) / job.mask.size, 3))
+
+        # Stage 3: inpaint
+        def inpaint_page(job):
+            if job.background is not None:
+                return
+            # Text-stripped pages only need inpainting for what is left of the mask
+            base = job.stripped if job.stripped is not None else job.image
+            ref = job.template_ref
+            if ref is not None and ref.background is not None and ref.background.shape == base.shape:
+                # Repeated regions: take the reference page's cleaned pixels, inpaint only the rest
+                for rows, cols in templates.zone_slices(job.template_zone):
+                    base[rows, cols] = ref.background[rows, cols]
+                    job.mask[rows, cols] = 0
+            # Reference pages are finished right away: the next pages borrow their cleaned pixels
+            background, solvers = self.inpaint_regions(base, job.mask, defer=job.template_out is None)
+            if isinstance(background, PendingInpaint):
+                job.pending = background
+            else:
+                job.background = background
+            if job.template_out is not None:
+                # The page's own array goes back to the pool, the reference keeps a copy
+                job.template_out.background = job.background.copy()
+            if self.metrics:
+                self.metrics.page(job.index + 1, **solvers)
+                if self.resources is not None:
+                    self.metrics.page(job.index + 1, ocr_threads=self.resources.ocr,
+                                      inpaint_threads=self.resources.inpaint)
+            if any(solvers[name] for name in REGION_SOLVERS):
+                self.log(f"  Page {job.index + 1}: regions solid={solvers['solid']} gradient={solvers['gradient']} "
+                         f"classical={solvers['classical']} lama={solvers['lama']} "
+                         f"(LaMa calls: {solvers['lama_calls']})")
+                self.emit('regions', page=job.index + 1, **solvers)
+            elif solvers['lama_calls'] == 0:
+                if job.stripped is not None:
+                    self.log(f"  Page {job.index + 1}: text-stripped background, no inpainting needed.")
+                else:
+                    self.log(f"  Page {job.index + 1}: no text mask, skipping inpainting.")
+            job.image = job.stripped = job.mask = None
+            if self.is_gpu: torch.cuda.empty_cache()
+
+        # Stage 4: encode straight to memory in the selected output codec
+        def encode_page(job):
+            if job.pending is not None:
+                # Batched LaMa crops of this page: wait for their batch (see LamaBatcher)
+                start = time.perf_counter()
+                job.background, job.pending = job.pending.result(), None
+                wait = time.perf_counter() - start
+                if self.metrics:
+                    self.metrics.page(job.index + 1, lama_wait_s=round(wait, 4))
+                if self.resources is not None:
+                    self.resources.observe('inpaint', wait)
+            if isinstance(job.background, np.ndarray):
+                # The one full-page copy: PIL encodes from its own buffer, the array returns to the pool
+                job.background = Image.fromarray(job.background)
+                self.release_buffers(job)
+            job.encoded, job.encoded_ext = self.encode_background(job.background, job.background_dpi or dpi)
+            if self.metrics:
+                self.metrics.page(job.index + 1, encoded_bytes=len(job.encoded))
+            if self.cache and not job.from_cache and job.cache_key is not None:
+                png_bytes = job.encoded if job.encoded_ext == 'png' and self.output_dpi is None else None
+                self.cache.put(job.cache_key, job.ocr_result, job.background, png_bytes=png_bytes)
+            if checkpoint is not None:
+                try:
+                    checkpoint.save(job)
+                except OSError as e:
+                    self.log(f"  Page {job.index + 1}: checkpoint not saved: {e}")
+
+            # Debug Mode: Export Clean Background
+            if debug_dir:
+                os.makedirs(debug_dir, exist_ok=True)
+                debug_save_path = os.path.join(debug_dir, f"page_{job.index+1}_clean_bg.png")
+                job.background.save(debug_save_path)
+            job.background = None
+
+        # Sink (calling thread): slides are streamed into the .pptx strictly in page order
+        failed = 0
+
+        def add_slide(job):
+            nonlocal writer, failed
+            self.release_buffers(job)
+            if pages is not None:
+                # Page range of a split conversion: the parent assembles the slides
+                failed += job.error is not None
+                if job.error is not None:
+                    self.log(f"Error processing page {job.index}: {job.error}")
+                self.emit('page_done', file=pdf_path, page=job.index + 1, total_pages=total_pages,
+                          ok=job.error is None)
+                return
+            if writer is None:
+                # The first page decides the slide size, as before
+                writer = StreamingPptxWriter(pptx_path, job.width_pt, job.height_pt)
+
+            if job.error is not None:
+                writer.add_slide()
+                self.log(f"Error processing page {job.index}: {job.error}")
+                self.emit('page_done', file=pdf_path, page=job.index + 1, total_pages=total_pages, ok=False)
+                return
+
+            try:
+                writer.add_slide(job.encoded, job.encoded_ext, job.width_pt, job.height_pt, job.text_blocks)
+            except Exception as e:
+                # Same empty slide as a failed page; if even that cannot be written the file fails
+                self.log(f"Error writing slide {job.index + 1}: {e}")
+                writer.add_slide()
+                self.emit('page_done', file=pdf_path, page=job.index + 1, total_pages=total_pages, ok=False)
+                return
+            finally:
+                job.encoded = None
+            self.emit('page_done', file=pdf_path, page=job.index + 1, total_pages=total_pages, ok=True)
 
+        if self.lama_batch_size > 1 and self.inpainter is not None:
+            self.batcher = LamaBatcher(self.inpainter, self.lama_batch_size, self.lama_batch_wait_ms)
+            self.log(f"Batching LaMa crops: up to {self.lama_batch_size} per pass, "
+                     f"{self.lama_batch_wait_ms} ms max wait")
+        write_error = None
+        try:
+            self.run_pipeline(render_pages, [('ocr', ocr_page), ('inpaint', inpaint_page), ('encode', encode_page)],
+                              add_slide)
+        except Exception as e:
+            write_error = e
+        finally:
+            if self.batcher is not None:
+                batcher, self.batcher = self.batcher, None
+                batcher.close(discard=self.stop_flag)
+                if self.metrics and batcher.batches:
+                    self.metrics.extra['lama_batches'] = batcher.batches
+                    self.metrics.extra['lama_batch_occupancy'] = round(
+                        batcher.items / (batcher.batches * batcher.batch_size), 3)
             pdf_file.close()
-            
-            self.log(f"Saving to: {pptx_path}")
+            if pdfium_doc is not None:
+                pdfium_doc.close()
+            if tile_doc is not None:
+                tile_doc.close()
+            if temp_root:
+                shutil.rmtree(temp_root, ignore_errors=True)
+        if self.metrics:
+            self.metrics.extra['buffers_allocated'] = self.buffers.allocated - pool_start[0]
+            self.metrics.extra['buffers_reused'] = self.buffers.reused - pool_start[1]
+            if self.resources is not None:
+                self.metrics.extra.update(self.resources.snapshot())
+
+        if self.stop_flag or write_error is not None:
+            if write_error is not None:
+                self.log(f"Error writing PPTX: {write_error}")
+            else:
+                self.log("Conversion Stopped by User.")
+            if writer is not None:
+                writer.abort()
+            self.finish_metrics(pptx_path, False, shard=pages is not None)
+            return False
+        if pages is not None:
+            self.finish_metrics(pptx_path, failed == 0, shard=True)
+            return failed == 0
+        
+        self.log(f"Saving to: {pptx_path}")
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                writer = StreamingPptxWriter(pptx_path, 720, 540)
+            writer.close()
+            self.log("Conversion Success!")
+            ok = True
+            if checkpoint is not None:
+                checkpoint.remove()
+        except Exception as e:
+            self.log(f"Error saving PPTX: {e}")
+            writer.abort()
+            ok = False
+        if self.metrics:
+            self.metrics.extra['save_s'] = round(time.perf_counter() - start, 4)
+        self.finish_metrics(pptx_path, ok)
+        return ok
+
+    def finish_metrics(self, pptx_path, ok, shard=False):
+        """Summarize the metrics of the file just converted: write them next to the output and call the hook.
+
+        A page range (`shard`) sends its stage rows and page fields to the parent
+        instead, which merges them into the metrics of the whole file.
+        """
+        metrics, self.metrics = self.metrics, None
+        if metrics is None:
+            return
+        if shard:
+            # The parent writes the slides and times that itself
+            stages = [row for row in metrics.stage_rows if row['stage'] != 'write']
+            self.emit('shard_metrics', stages=stages, pages=list(metrics.pages.values()))
+            return
+        summary = metrics.summary(ok)
+        self.last_metrics = summary
+        if self.metrics_enabled:
+            base = os.path.splitext(pptx_path)[0]
             try:
-                prs.save(pptx_path)
-                self.log("Conversion Success!")
-                # Explicitly delete the Presentation object to free memory
-                del prs
-                gc.collect()
-                return True
+                metrics.write(base, summary)
+                self.log(f"Metrics written to: {base}_metrics.json")
+            except OSError as e:
+                self.log(f"Error writing metrics: {e}")
+        self.emit('metrics', summary={k: v for k, v in summary.items() if k != 'page_details'})
+        if self.metrics_hook is not None:
+            try:
+                self.metrics_hook(summary)
+            except Exception as e:
+                self.log(f"Metrics hook failed: {e}")
+
+
+# --- Batch Execution (Multi-Process) ---
+def batch_worker(worker_id, task_queue, event_queue, stop_event, converter_options):
+    """Worker process loop: load the models once, then convert files until the queue is drained.
+
+    Everything the worker has to say (logs, page progress, per-file results) is
+    posted to `event_queue` as (kind, worker_id, payload) tuples.
+    """
+    def log(msg):
+        event_queue.put(('log', worker_id, msg))
+
+    def progress(event):
+        event_queue.put(('progress', worker_id, event))
+
+    # Worker processes are daemonic and cannot start page workers of their own
+    converter = ConverterLogic(log_callback=log, progress_callback=progress,
+                               **dict(converter_options, page_workers=1))
+
+    # Forward the shared stop event to this process' converter. Timed waits: a process that exits
+    # while blocked in stop_event.wait() leaves a sleeper behind and stop_event.set() then hangs
+    finished = threading.Event()
+
+    def watch_stop():
+        while not finished.is_set():
+            if stop_event.wait(0.5):
+                converter.stop_flag = True
+                return
+    watcher = threading.Thread(target=watch_stop, daemon=True)
+    watcher.start()
+    try:
+        if not converter.initialize_models():
+            event_queue.put(('init_failed', worker_id, None))
+            return
+        event_queue.put(('ready', worker_id, None))
+
+        while not stop_event.is_set():
+            task = task_queue.get()
+            if task is None:
+                break
+            index, pdf_path, pptx_path, dpi, dilation_size, debug_mode, pages, job_dir = task
+            event_queue.put(('start', worker_id, (index, pdf_path)))
+            # Page ranges are checkpointed into the job directory of the conversion they belong to
+            converter.job_dir = job_dir or converter_options.get('job_dir')
+            try:
+                ok = converter.convert(pdf_path, pptx_path, dpi, dilation_size, debug_mode, pages=pages)
             except Exception as e:
-                self.log(f"Error saving PPTX: {e}")
-                del prs
-                gc.collect()
+                log(f"Error: {e}")
+                ok = False
+            converter.cleanup_file()
+            event_queue.put(('result', worker_id, (index, pdf_path, ok)))
+    finally:
+        finished.set()
+        watcher.join()
+        event_queue.put(('exit', worker_id, None))
+
+
+class BatchExecutor:
+    """Convert a queue of PDFs on several worker processes.
+
+    Each worker process owns a ConverterLogic and loads its models once through
+    initialize_models(). The processes outlive run(): later runs reuse them warm
+    until close(). Worker output is streamed back in real time:
+    `log_callback(msg)`, `progress_callback(worker_id, event)` and
+    `result_callback(pdf_path, ok)` are all called on the thread running run().
+    """
+    def __init__(self, workers, log_callback=print, progress_callback=None, result_callback=None,
+                 converter_options=None):
+        self.workers = max(1, workers)
+        self.log = log_callback
+        self.progress_callback = progress_callback
+        self.result_callback = result_callback
+        self.converter_options = converter_options or {}
+        # 'spawn' everywhere: forking a process that already holds torch/onnxruntime threads is unsafe
+        self.ctx = multiprocessing.get_context('spawn')
+        self.stop_event = self.ctx.Event()
+        # Each worker is pinned to its own slice of the CPUs so their thread pools do not compete
+        self.cpu_sets = worker_cpu_sets(self.workers, self.converter_options.get('cores'))
+        self.task_queue = None
+        self.event_queue = None
+        self.processes = {}
+        # Workers that could not load their models are not started again
+        self.failed = set()
+        self.init_failures = 0
+
+    def stop(self):
+        self.stop_event.set()
+
+    def start(self, workers):
+        """Make sure `workers` processes are running, spawning only the missing ones"""
+        if self.stop_event.is_set():
+            # The workers of a stopped run are exiting: start over with fresh queues
+            self.shutdown()
+            self.stop_event.clear()
+        if self.task_queue is None:
+            self.task_queue = self.ctx.Queue()
+            self.event_queue = self.ctx.Queue()
+        wanted = [w for w in range(min(workers, self.workers)) if w not in self.failed]
+        spawn = [w for w in wanted if w not in self.processes or not self.processes[w].is_alive()]
+        if spawn:
+            self.log(f"Starting {len(spawn)} worker processes (each loads its own models)...")
+        for worker_id in spawn:
+            options = dict(self.converter_options, cpu_set=self.cpu_sets[worker_id])
+            proc = self.ctx.Process(target=batch_worker,
+                                    args=(worker_id, self.task_queue, self.event_queue, self.stop_event, options),
+                                    daemon=True)
+            proc.start()
+            self.processes[worker_id] = proc
+        return {w for w in wanted if self.processes[w].is_alive()}
+
+    def run(self, jobs, dpi, dilation_size, debug_mode=False):
+        """Convert (pdf_path, pptx_path) pairs. Returns a list of per-file booleans in input order.
+
+        A job may carry a third item, a list of page indices, and a fourth, the
+        job directory: the worker then converts only those pages into that job
+        directory (see ConverterLogic.convert).
+        """
+        results = [False] * len(jobs)
+        if not jobs:
+            return results
+
+        running = self.start(len(jobs))
+        for index, (pdf_path, pptx_path, *rest) in enumerate(jobs):
+            pages, job_dir = (list(rest) + [None, None])[:2]
+            self.task_queue.put((index, pdf_path, pptx_path, dpi, dilation_size, debug_mode, pages, job_dir))
+
+        remaining = len(jobs)
+        in_flight = {}
+        while running and remaining:
+            try:
+                kind, worker_id, payload = self.event_queue.get(timeout=0.5)
+            except queue.Empty:
+                # A worker that died without saying goodbye (e.g. OOM-killed) fails its current file
+                for worker_id in list(running):
+                    if not self.processes[worker_id].is_alive():
+                        running.discard(worker_id)
+                        if worker_id in in_flight:
+                            index, pdf_path = in_flight.pop(worker_id)
+                            remaining -= 1
+                            self.log(f"[W{worker_id}] Worker exited unexpectedly while converting {os.path.basename(pdf_path)}")
+                            if self.result_callback:
+                                self.result_callback(pdf_path, False)
+                continue
+
+            if kind == 'log':
+                self.log(f"[W{worker_id}] {payload}")
+            elif kind == 'progress':
+                if self.progress_callback:
+                    self.progress_callback(worker_id, payload)
+            elif kind == 'start':
+                in_flight[worker_id] = payload
+            elif kind == 'result':
+                index, pdf_path, ok = payload
+                in_flight.pop(worker_id, None)
+                remaining -= 1
+                results[index] = ok
+                if self.result_callback:
+                    self.result_callback(pdf_path, ok)
+            elif kind == 'init_failed':
+                self.failed.add(worker_id)
+                self.init_failures += 1
+                self.log(f"[W{worker_id}] CRITICAL: Failed to init models.")
+            elif kind == 'exit':
+                running.discard(worker_id)
+
+        if remaining:
+            # No worker left to take the queued files (stopped, crashed or failed to start): they stay failed
+            self.shutdown()
+        return results
+
+    def shutdown(self):
+        """Stop the worker processes and drop the queues, discarding any queued files"""
+        self.stop_event.set()
+        for proc in self.processes.values():
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self.processes = {}
+        self.task_queue = self.event_queue = None
+
+    def close(self):
+        """Let the idle workers exit once the models are no longer needed"""
+        for proc in self.processes.values():
+            if proc.is_alive():
+                self.task_queue.put(None)
+        for proc in self.processes.values():
+            proc.join(timeout=5)
+        self.processes = {}
+        self.task_queue = self.event_queue = None
+
+
+# --- Conversion Service (HTTP) ---
+class ConversionService:
+    """Long-lived conversion service: warm worker processes behind a small local HTTP API.
+
+    `workers` processes run batch_worker() and keep their models loaded between
+    jobs, so a short document only costs its own conversion time. Processes
+    rather than threads, since pdfium is not thread-safe. Jobs wait in a bounded
+    queue: once `queue_size` jobs are waiting, submissions get 503 with a
+    Retry-After header so callers back off. Uploaded PDFs and results live in a
+    private work directory until they are deleted or expire. A worker that
+    cannot load its models is not restarted; once none can, pending jobs fail
+    and /health reports the error with a 503.
+
+      POST   /jobs?dpi=&dilation=   body: the PDF      -> 202 {"id", "status", ...}
+      GET    /jobs/<id>             status and page progress
+      GET    /jobs/<id>/result      the .pptx once the status is "done"
+      DELETE /jobs/<id>             drop a finished job and its files
+      GET    /health                worker and queue counters
+    """
+    def __init__(self, workers=1, queue_size=SERVICE_QUEUE_SIZE, dpi=100, dilation_size=15,
+                 converter_options=None, log_callback=print):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.dpi = dpi
+        self.dilation_size = dilation_size
+        self.converter_options = converter_options or {}
+        # One CPU slice per worker, kept when a crashed worker is respawned
+        self.cpu_sets = worker_cpu_sets(self.workers, self.converter_options.get('cores'))
+        self.log = log_callback
+        self.ctx = multiprocessing.get_context('spawn')
+        self.task_queue = self.ctx.Queue()
+        self.event_queue = self.ctx.Queue()
+        self.stop_event = self.ctx.Event()
+        self.work_dir = tempfile.mkdtemp(prefix="pdf2pptx-service-")
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.processes = {}
+        self.ready = set()
+        self.in_flight = {}
+        # Workers whose models failed to load (or that died loading them): never respawned
+        self.init_failed = set()
+        self.error = None
+        self.closing = False
+
+    def start(self):
+        """Start the worker processes; they load their models in the background"""
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+        threading.Thread(target=self._watch_events, daemon=True).start()
+
+    def _spawn(self, worker_id):
+        options = dict(self.converter_options, cpu_set=self.cpu_sets[worker_id])
+        proc = self.ctx.Process(target=batch_worker,
+                                args=(worker_id, self.task_queue, self.event_queue, self.stop_event,
+                                      options), daemon=True)
+        proc.start()
+        self.processes[worker_id] = proc
+
+    def queued(self):
+        return sum(1 for job in self.jobs.values() if job['status'] == 'queued')
+
+    def submit(self, data, dpi=None, dilation_size=None):
+        """Queue a PDF given as bytes. Returns (http_status, payload)"""
+        if not data.startswith(b"%PDF-"):
+            return 400, {'error': "body is not a PDF"}
+        for name, value, (low, high) in (('dpi', dpi, SERVICE_DPI_RANGE),
+                                         ('dilation', dilation_size, SERVICE_DILATION_RANGE)):
+            if value is not None and not low <= value <= high:
+                return 400, {'error': f"{name} must be between {low} and {high}"}
+        with self.lock:
+            if self.error:
+                return 503, {'error': self.error}
+            self._expire()
+            if self.queued() >= self.queue_size:
+                return 503, {'error': "queue full, retry later", 'queued': self.queued()}
+            job_id = uuid.uuid4().hex
+            pdf_path = os.path.join(self.work_dir, job_id + ".pdf")
+            pptx_path = os.path.join(self.work_dir, job_id + ".pptx")
+            with open(pdf_path, "wb") as f:
+                f.write(data)
+            self.jobs[job_id] = {'id': job_id, 'status': 'queued', 'pages_done': 0, 'total_pages': None,
+                                 'submitted': time.time(), 'started': None, 'finished': None,
+                                 'pdf_path': pdf_path, 'pptx_path': pptx_path}
+        self.task_queue.put((job_id, pdf_path, pptx_path, self.dpi if dpi is None else dpi,
+                             self.dilation_size if dilation_size is None else dilation_size, False, None, None))
+        return 202, self.status(job_id)
+
+    def status(self, job_id):
+        """Public view of a job, or None if it is unknown"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            view = {k: v for k, v in job.items() if not k.endswith('_path')}
+        if view['finished'] and view['started']:
+            view['seconds'] = round(view['finished'] - view['started'], 3)
+        return view
+
+    def result_path(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return job['pptx_path'] if job and job['status'] == 'done' else None
+
+    def delete(self, job_id):
+        """Drop a finished job. Returns False for unknown or still active jobs"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job['status'] in ('queued', 'running'):
                 return False
+            self._drop(job_id)
+            return True
+
+    def _drop(self, job_id):
+        job = self.jobs.pop(job_id)
+        for path in (job['pdf_path'], job['pptx_path']):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _expire(self):
+        limit = time.time() - SERVICE_RESULT_TTL_S
+        for job_id in [k for k, job in self.jobs.items() if job['finished'] and job['finished'] < limit]:
+            self._drop(job_id)
+
+    def _finish(self, job_id, ok, error=None):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        job['status'] = 'done' if ok else 'failed'
+        job['finished'] = time.time()
+        if error:
+            job['error'] = error
+        try:
+            os.remove(job['pdf_path'])
+        except OSError:
+            pass
+
+    def _watch_events(self):
+        """Apply worker events to the job table; replace workers that die"""
+        while not self.closing:
+            try:
+                kind, worker_id, payload = self.event_queue.get(timeout=0.5)
+            except queue.Empty:
+                with self.lock:
+                    for worker_id, proc in list(self.processes.items()):
+                        if proc.is_alive() or self.closing:
+                            continue
+                        job_id = self.in_flight.pop(worker_id, None)
+                        if job_id is not None:
+                            self.log(f"[W{worker_id}] Worker exited unexpectedly, job {job_id} failed.")
+                            self._finish(job_id, False, "worker exited unexpectedly")
+                        if worker_id not in self.ready and worker_id not in self.init_failed:
+                            self.log(f"[W{worker_id}] Worker exited while loading its models.")
+                            self._init_failed(worker_id)
+                        self.ready.discard(worker_id)
+                        if worker_id in self.init_failed:
+                            del self.processes[worker_id]
+                        else:
+                            self._spawn(worker_id)
+                continue
+            with self.lock:
+                if kind == 'log':
+                    self.log(f"[W{worker_id}] {payload}")
+                elif kind == 'ready':
+                    self.ready.add(worker_id)
+                    self.log(f"[W{worker_id}] Models loaded, ready for jobs.")
+                elif kind == 'start':
+                    job_id = payload[0]
+                    self.in_flight[worker_id] = job_id
+                    if job_id in self.jobs:
+                        self.jobs[job_id].update(status='running', started=time.time(), worker=worker_id)
+                elif kind == 'progress':
+                    job = self.jobs.get(self.in_flight.get(worker_id))
+                    if job is not None and payload.get('event') == 'file_start':
+                        job['total_pages'] = payload.get('total_pages')
+                    elif job is not None and payload.get('event') == 'page_done':
+                        job['pages_done'] += 1
+                elif kind == 'result':
+                    job_id, _pdf_path, ok = payload
+                    self.in_flight.pop(worker_id, None)
+                    self._finish(job_id, ok, None if ok else "conversion failed")
+                elif kind == 'init_failed':
+                    self.log(f"[W{worker_id}] CRITICAL: Failed to init models, not restarting this worker.")
+                    self._init_failed(worker_id)
+                elif kind == 'exit':
+                    self.ready.discard(worker_id)
+
+    def _init_failed(self, worker_id):
+        """Record a worker that cannot load its models; fail everything once no worker can"""
+        self.init_failed.add(worker_id)
+        if len(self.init_failed) < self.workers or self.error:
+            return
+        self.error = "no worker could load the OCR/LaMa models"
+        self.log(f"CRITICAL: {self.error}, failing all pending jobs.")
+        for job_id, job in list(self.jobs.items()):
+            if job['status'] in ('queued', 'running'):
+                self._finish(job_id, False, self.error)
+        self.in_flight.clear()
+
+    def health(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            health = {'workers': self.workers, 'workers_ready': len(self.ready),
+                      'workers_failed': len(self.init_failed), 'queue_size': self.queue_size, 'jobs': counts}
+            if self.error:
+                health['error'] = self.error
+            return health
+
+    def close(self):
+        """Stop the workers and remove the work directory"""
+        self.closing = True
+        self.stop_event.set()
+        for _ in self.processes:
+            self.task_queue.put(None)
+        for proc in self.processes.values():
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def make_server(self, host="127.0.0.1", port=8765):
+        """Build the HTTP server; call serve_forever() on the result"""
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def send_json(self, code, payload, headers=()):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def route(self):
+                parts = [p for p in urlsplit(self.path).path.split("/") if p]
+                return parts + [None] * (3 - len(parts))
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                if url.path.rstrip("/") != "/jobs":
+                    return self.send_json(404, {'error': "not found"})
+                length = int(self.headers.get("Content-Length") or 0)
+                if length <= 0:
+                    return self.send_json(411, {'error': "PDF body with Content-Length required"})
+                if length > SERVICE_MAX_UPLOAD_MB * 1024 * 1024:
+                    return self.send_json(413, {'error': f"PDF larger than {SERVICE_MAX_UPLOAD_MB} MB"})
+                data = self.rfile.read(length)
+                params = parse_qs(url.query)
+                try:
+                    dpi = int(params['dpi'][0]) if 'dpi' in params else None
+                    dilation = int(params['dilation'][0]) if 'dilation' in params else None
+                except ValueError:
+                    return self.send_json(400, {'error': "dpi and dilation must be integers"})
+                code, payload = service.submit(data, dpi, dilation)
+                headers = [("Retry-After", "1")] if code == 503 else []
+                if code == 202:
+                    headers.append(("Location", f"/jobs/{payload['id']}"))
+                self.send_json(code, payload, headers)
+
+            def do_GET(self):
+                first, job_id, action = self.route()
+                if first == "health" and job_id is None:
+                    health = service.health()
+                    return self.send_json(503 if 'error' in health else 200, health)
+                if first != "jobs" or job_id is None:
+                    return self.send_json(404, {'error': "not found"})
+                status = service.status(job_id)
+                if status is None:
+                    return self.send_json(404, {'error': "unknown job"})
+                if action is None:
+                    return self.send_json(200, status)
+                if action != "result":
+                    return self.send_json(404, {'error': "not found"})
+                path = service.result_path(job_id)
+                if path is None:
+                    return self.send_json(409, status)
+                self.send_response(200)
+                self.send_header("Content-Type",
+                                 "application/vnd.openxmlformats-officedocument.presentationml.presentation")
+                self.send_header("Content-Length", str(os.path.getsize(path)))
+                self.end_headers()
+                with open(path, "rb") as f:
+                    shutil.copyfileobj(f, self.wfile)
+
+            def do_DELETE(self):
+                first, job_id, action = self.route()
+                if first != "jobs" or job_id is None or action is not None:
+                    return self.send_json(404, {'error': "not found"})
+                if service.status(job_id) is None:
+                    return self.send_json(404, {'error': "unknown job"})
+                if not service.delete(job_id):
+                    return self.send_json(409, {'error': "job is still queued or running"})
+                self.send_json(200, {'id': job_id, 'deleted': True})
+
+            def log_message(self, format, *args):
+                pass
+
+        return ThreadingHTTPServer((host, port), Handler)
+
+
+def run_service(args, options, log=print):
+    """--serve: run the conversion service until interrupted"""
+    service = ConversionService(workers=args.workers, queue_size=args.queue_size, dpi=args.dpi,
+                                dilation_size=args.dilation, converter_options=options, log_callback=log)
+    try:
+        server = service.make_server(args.host, args.serve)
+    except OSError as e:
+        log(f"Error starting service on {args.host}:{args.serve}: {e}")
+        return EXIT_USAGE
+    service.start()
+    log(f"Serving on http://{args.host}:{args.serve} with {service.workers} worker(s), loading models...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return EXIT_OK
+
+# --- Headless API & CLI ---
+EXIT_OK = 0
+EXIT_FAILED = 1         # At least one file failed to convert
+EXIT_USAGE = 2          # Bad arguments or no input files
+EXIT_INIT_FAILED = 3    # OCR / LaMa models could not be loaded
+EXIT_INTERRUPTED = 130
+
+
+def expand_inputs(patterns):
+    """Expand files, directories (their *.pdf) and glob patterns into a de-duplicated list of PDFs"""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "*.pdf")) + glob.glob(os.path.join(pattern, "*.PDF")))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        for f in matches:
+            if f.lower().endswith(".pdf") and os.path.isfile(f) and f not in files:
+                files.append(f)
+    return files
+
+
+def output_path_for(pdf_path, output_dir=None):
+    base = os.path.splitext(os.path.basename(pdf_path))[0] + "_Editable.pptx"
+    return os.path.join(output_dir or os.path.dirname(os.path.abspath(pdf_path)), base)
+
+
+def convert_files(inputs, output_dir=None, dpi=100, dilation_size=15, workers=1, debug_mode=False,
+                  log_callback=print, progress_callback=None, converter_options=None, converter=None):
+    """Convert PDFs without any GUI. Models are loaded once and reused for the whole batch.
+
+    `inputs` may mix files, directories and glob patterns. `progress_callback`
+    receives every progress event as a dict (file_start, stage, page_done,
+    file_done, ...). With workers > 1 files are spread over that many processes.
+    An already initialized `converter` may be passed in to reuse its warm models.
+    Returns (results, exit_code) where results is a list of dicts with
+    'input', 'output', 'ok' and 'seconds'.
+    """
+    files = expand_inputs(inputs)
+    if not files:
+        log_callback("No PDF files found.")
+        return [], EXIT_USAGE
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    jobs = [(f, output_path_for(f, output_dir)) for f in files]
+    emit = progress_callback or (lambda event: None)
+    results = []
+
+    if workers > 1 and len(jobs) > 1:
+        started = {}
+
+        def on_progress(worker_id, event):
+            event['worker'] = worker_id
+            if event['event'] == 'file_start':
+                started.setdefault(event['file'], time.perf_counter())
+            emit(event)
+
+        def on_result(pdf_path, ok):
+            seconds = round(time.perf_counter() - started.get(pdf_path, time.perf_counter()), 3)
+            results.append({'input': pdf_path, 'output': output_path_for(pdf_path, output_dir), 'ok': ok, 'seconds': seconds})
+            emit({'event': 'file_done', 'file': pdf_path, 'ok': ok, 'seconds': seconds})
+
+        executor = BatchExecutor(workers, log_callback=log_callback, progress_callback=on_progress,
+                                 result_callback=on_result, converter_options=converter_options)
+        try:
+            executor.run(jobs, dpi, dilation_size, debug_mode)
+        except KeyboardInterrupt:
+            executor.stop()
+            return results, EXIT_INTERRUPTED
+        finally:
+            executor.close()
+        if executor.init_failures >= min(workers, len(jobs)):
+            return results, EXIT_INIT_FAILED
+        # Keep the input order regardless of completion order
+        order = {f: n for n, f in enumerate(files)}
+        results.sort(key=lambda r: order[r['input']])
+    else:
+        owned = converter is None
+        if owned:
+            converter = ConverterLogic(log_callback=log_callback, progress_callback=emit, **(converter_options or {}))
+        # With page workers the models load in the workers; convert() loads them here only if needed
+        if converter.page_workers <= 1 and not converter.initialize_models():
+            return results, EXIT_INIT_FAILED
+        try:
+            for pdf_path, pptx_path in jobs:
+                start = time.perf_counter()
+                try:
+                    ok = converter.convert(pdf_path, pptx_path, dpi, dilation_size, debug_mode)
+                except KeyboardInterrupt:
+                    converter.stop_flag = True
+                    return results, EXIT_INTERRUPTED
+                except Exception as e:
+                    log_callback(f"Error: {e}")
+                    ok = False
+                converter.cleanup_file()
+                seconds = round(time.perf_counter() - start, 3)
+                results.append({'input': pdf_path, 'output': pptx_path, 'ok': ok, 'seconds': seconds})
+                emit({'event': 'file_done', 'file': pdf_path, 'ok': ok, 'seconds': seconds})
+        finally:
+            if owned:
+                converter.close_page_workers()
+
+    emit({'event': 'batch_done', 'succeeded': sum(r['ok'] for r in results), 'total': len(jobs)})
+    return results, EXIT_OK if len(results) == len(jobs) and all(r['ok'] for r in results) else EXIT_FAILED
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog="pdf2pptx_converter.py",
+        description="Convert PDF slides into editable PowerPoint files. Run without arguments for the GUI.")
+    parser.add_argument("inputs", nargs="*", help="PDF files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", help="Directory for the .pptx files (default: next to each PDF)")
+    parser.add_argument("--dpi", type=int, default=100, help="Render resolution (default: 100)")
+    parser.add_argument("--dilation", type=int, default=15,
+                        help="Artifact cleanup strength, scales the per-line mask dilation (default: 15)")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="Number of worker processes (default: 1)")
+    parser.add_argument("--debug", action="store_true", help="Export cleaned backgrounds as debug images")
+    parser.add_argument("--jsonl", action="store_true",
+                        help="Write progress and log events as JSON lines to stdout")
+    parser.add_argument("--cache-dir", nargs="?", const=DEFAULT_CACHE_DIR, default=None,
+                        help=f"Enable the page result cache (default dir: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB)
+    parser.add_argument("--no-native-text", action="store_true", help="Always OCR, ignore embedded PDF text")
+    parser.add_argument("--background-mode", choices=["auto", "inpaint"], default="auto")
+    parser.add_argument("--image-format", choices=["jpeg", "webp", "png"], default=DEFAULT_IMAGE_FORMAT,
+                        help=f"Slide background codec (default: {DEFAULT_IMAGE_FORMAT}; png is lossless)")
+    parser.add_argument("--image-quality", type=int, default=DEFAULT_IMAGE_QUALITY,
+                        help=f"JPEG/WebP quality 1-100 (default: {DEFAULT_IMAGE_QUALITY})")
+    parser.add_argument("--png-compress-level", type=int, choices=range(10), default=DEFAULT_PNG_COMPRESS_LEVEL,
+                        metavar="0-9", help=f"PNG zlib level (default: {DEFAULT_PNG_COMPRESS_LEVEL})")
+    parser.add_argument("--output-dpi", type=int, default=None, help="Downsample backgrounds to this DPI")
+    parser.add_argument("--roi-padding", type=int, default=DEFAULT_ROI_PADDING)
+    parser.add_argument("--inpaint-backend", choices=["auto", "torch", "onnx"], default="auto",
+                        help="LaMa runtime (default: auto = ONNX Runtime on CPU when an ONNX model is available)")
+    parser.add_argument("--onnx-model", default=None,
+                        help=f"LaMa ONNX model (default: $LAMA_ONNX_MODEL or {DEFAULT_ONNX_MODEL})")
+    parser.add_argument("--inpaint-precision", choices=INPAINT_PRECISIONS, default="fp32",
+                        help="LaMa numeric mode: fp32, frozen/bf16 (torch) or int8 (onnx) (default: fp32)")
+    parser.add_argument("--lama-batch", type=int, default=1,
+                        help="Run up to this many same-size LaMa crops from consecutive pages per forward pass (default: 1)")
+    parser.add_argument("--lama-batch-wait", type=int, default=LAMA_BATCH_WAIT_MS, metavar="MS",
+                        help=f"Longest a crop waits for its batch to fill (default: {LAMA_BATCH_WAIT_MS})")
+    parser.add_argument("--cores", type=int, default=None,
+                        help="Core budget split between OCR and inpainting threads and across -j workers, "
+                             "0 = all CPUs of the process (default: off, each library sizes its own threads)")
+    parser.add_argument("--ort-intra-threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = auto)")
+    parser.add_argument("--ort-inter-threads", type=int, default=0, help="ONNX Runtime inter-op threads (0 = auto)")
+    parser.add_argument("--region-solver", choices=["auto", "lama"], default="auto",
+                        help="auto: fill flat/low-texture regions without LaMa (default); lama: LaMa everywhere")
+    parser.add_argument("--ocr-dpi", type=int, default=DEFAULT_OCR_DPI,
+                        help=f"Detect text at this DPI when rendering above it (default: {DEFAULT_OCR_DPI}, 0 = render DPI)")
+    parser.add_argument("--ocr-small-text-px", type=int, default=OCR_SMALL_TEXT_PX,
+                        help="Re-read lines shorter than this (detection pixels) from full-resolution crops")
+    parser.add_argument("--no-ocr-det", action="store_true", help="RapidOCR: skip text detection")
+    parser.add_argument("--no-ocr-cls", action="store_true", help="RapidOCR: skip text angle classification")
+    parser.add_argument("--no-ocr-rec", action="store_true",
+                        help="RapidOCR: skip recognition (text is erased but no text boxes are created)")
+    parser.add_argument("--no-template-reuse", action="store_true",
+                        help="Process every page fully, even regions repeated from earlier pages")
+    parser.add_argument("--max-megapixels", type=float, default=DEFAULT_MAX_MEGAPIXELS,
+                        help=f"Process pages larger than this in overlapping tiles (default: {DEFAULT_MAX_MEGAPIXELS}, 0 = never)")
+    parser.add_argument("--page-workers", type=int, default=1,
+                        help="Split the pages of each PDF across this many processes (default: 1)")
+    parser.add_argument("--job-dir", default=None,
+                        help="Keep finished pages here so an interrupted conversion resumes where it stopped")
+    parser.add_argument("--serve", type=int, metavar="PORT", default=None,
+                        help="Run as a local HTTP conversion service on this port (warm models, job queue)")
+    parser.add_argument("--host", default="127.0.0.1", help="Address the service listens on (default: 127.0.0.1)")
+    parser.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE,
+                        help=f"Service: jobs waiting for a worker before new ones get 503 (default: {SERVICE_QUEUE_SIZE})")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Write per-stage timings, memory and mask stats to <output>_metrics.json/.csv")
+    parser.add_argument("--inpaint-parity", action="store_true",
+                        help="Compare the torch and ONNX inpainting backends on a synthetic image and exit")
+    parser.add_argument("--precision-report", action="store_true",
+                        help="Check each --inpaint-precision mode of the backend against fp32 (PSNR/SSIM, speed) and exit")
+    return parser
+
+
+def run_inpaint_parity(args, log=print):
+    """--inpaint-parity: both backends must agree within PARITY_MIN_PSNR inside the mask"""
+    try:
+        reference = TorchLamaInpainter()
+        candidate = OnnxLamaInpainter(args.onnx_model or default_onnx_model_path(),
+                                      args.ort_intra_threads, args.ort_inter_threads)
+    except Exception as e:
+        log(f"Error initializing inpainters: {e}")
+        return EXIT_INIT_FAILED
+    report = inpainter_parity(reference, candidate)
+    report['ok'] = report['psnr_db'] >= PARITY_MIN_PSNR
+    log(json.dumps(report))
+    return EXIT_OK if report['ok'] else EXIT_FAILED
+
+
+def run_precision_report(args, log=print):
+    """--precision-report: one JSON line per precision mode, then the fastest mode that passes"""
+    try:
+        reports = precision_report(args.inpaint_backend, args.onnx_model, args.ort_intra_threads,
+                                   args.ort_inter_threads, log=lambda msg: None)
+    except Exception as e:
+        log(f"Error initializing inpainters: {e}")
+        return EXIT_INIT_FAILED
+    for report in reports:
+        log(json.dumps(report))
+    passing = [r for r in reports if r['ok']]
+    best = max(passing, key=lambda r: r['speedup'] or 0, default=None)
+    log(json.dumps({'recommended_precision': best['precision'] if best and (best['speedup'] or 0) > 1 else 'fp32'}))
+    return EXIT_OK
+
+
+def main(argv=None):
+    """Command line entry point. Returns the process exit code."""
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    # Legacy form used by run_convert.bat: input.pdf output.pptx [DPI] [Dilation]
+    if len(argv) >= 2 and argv[1].lower().endswith(".pptx") and not argv[0].startswith("-"):
+        pdf_file, pptx_file = argv[0], argv[1]
+        try:
+            dpi = int(argv[2]) if len(argv) > 2 else 100
+            dilation = int(argv[3]) if len(argv) > 3 else 15
+        except ValueError:
+            print("Usage: pdf2pptx_converter.py input.pdf output.pptx [DPI] [Dilation]")
+            return EXIT_USAGE
+        if not os.path.exists(pdf_file):
+            print(f"File not found: {pdf_file}")
+            return EXIT_USAGE
+        print(f"CLI Mode: DPI={dpi}, Dilation={dilation}")
+        logic = ConverterLogic()
+        if not logic.initialize_models():
+            return EXIT_INIT_FAILED
+        return EXIT_OK if logic.convert(pdf_file, pptx_file, dpi, dilation) else EXIT_FAILED
+
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.inpaint_parity:
+        return run_inpaint_parity(args)
+    if args.precision_report:
+        return run_precision_report(args)
+    if args.inpaint_backend == 'torch' and args.inpaint_precision == 'int8':
+        parser.error("--inpaint-precision int8 needs --inpaint-backend onnx (or auto with an ONNX model)")
+    if not args.inputs and args.serve is None:
+        parser.error("the following arguments are required: inputs")
+    options = {
+        'cache_dir': args.cache_dir,
+        'cache_size_mb': args.cache_size_mb,
+        'native_text': not args.no_native_text,
+        'background_mode': args.background_mode,
+        'image_format': args.image_format,
+        'image_quality': args.image_quality,
+        'png_compress_level': args.png_compress_level,
+        'output_dpi': args.output_dpi,
+        'roi_padding': args.roi_padding,
+        'inpaint_backend': args.inpaint_backend,
+        'onnx_model': args.onnx_model,
+        'ort_intra_threads': args.ort_intra_threads,
+        'ort_inter_threads': args.ort_inter_threads,
+        'region_solver': args.region_solver,
+        'metrics': args.metrics,
+        'ocr_dpi': args.ocr_dpi or None,
+        'ocr_small_text_px': args.ocr_small_text_px,
+        'ocr_use_det': not args.no_ocr_det,
+        'ocr_use_cls': not args.no_ocr_cls,
+        'ocr_use_rec': not args.no_ocr_rec,
+        'template_reuse': not args.no_template_reuse,
+        'inpaint_precision': args.inpaint_precision,
+        'lama_batch_size': args.lama_batch,
+        'lama_batch_wait_ms': args.lama_batch_wait,
+        'cores': args.cores,
+        'max_megapixels': args.max_megapixels,
+        'job_dir': args.job_dir,
+        'page_workers': args.page_workers,
+    }
+    if args.serve is not None:
+        return run_service(args, options)
+
+    if args.jsonl:
+        # stdout carries only JSON lines; logs become 'log' events
+        lock = threading.Lock()
+
+        def progress(event):
+            with lock:
+                sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+                sys.stdout.flush()
+
+        def log(msg):
+            progress({'event': 'log', 'message': msg})
+    else:
+        progress = None
+        log = print
+
+    results, code = convert_files(args.inputs, output_dir=args.output_dir, dpi=args.dpi, dilation_size=args.dilation,
+                                  workers=args.workers, debug_mode=args.debug, log_callback=log,
+                                  progress_callback=progress, converter_options=options)
+    if not args.jsonl and results:
+        log(f"--- COMPLETED: {sum(r['ok'] for r in results)}/{len(results)} SUCCEEDED ---")
+    return code
 
 # --- GUI Application (Modern Content) ---
 # Try to import tkinterdnd2 for native drag-drop support
@@ -318,6 +3777,17 @@ class App:
             self.log("Ready. Drag PDF files to the list on the left.")
         else:
             self.log("Ready. Click '+ Add PDFs' to start.")
+        self.log(f"Startup took {time.perf_counter() - _STARTUP_T0:.1f}s. Loading AI models in the background...")
+
+        # Warm up OCR + LaMa while the user picks files; run_batch reuses these models
+        self.warm_converter = ConverterLogic(log_callback=self.log_thread_safe)
+        self.warm_converter.start_warmup(on_done=self.on_models_ready)
+
+    def on_models_ready(self, ok):
+        if ok:
+            self.log_thread_safe(f"AI models ready ({time.perf_counter() - _STARTUP_T0:.1f}s after launch).")
+        else:
+            self.log_thread_safe("CRITICAL: Failed to init models.")
 
     def setup_style(self):
         style = ttk.Style()
@@ -364,6 +3834,11 @@ class App:
                         fieldbackground=self.colors["entry_bg"], 
                         foreground=self.colors["fg_text"],
                         arrowcolor=self.colors["fg_text"])
+        style.configure("TCombobox",
+                        fieldbackground=self.colors["entry_bg"],
+                        foreground=self.colors["fg_text"],
+                        arrowcolor=self.colors["fg_text"])
+        style.map("TCombobox", fieldbackground=[("readonly", self.colors["entry_bg"])])
 
     def create_header(self):
         header_frame = ttk.Frame(self.root, padding="20 15 20 0")
@@ -448,10 +3923,41 @@ class App:
         spin_dil = ttk.Spinbox(row2, from_=0, to=50, textvariable=self.dil_var, width=5)
         spin_dil.pack(side="right")
         
+        # Parallel workers
+        row3 = ttk.Frame(card_settings, style="Card.TFrame")
+        row3.pack(fill="x", pady=2)
+        ttk.Label(row3, text="Parallel Files:", background=self.colors["bg_sec"]).pack(side="left")
+        self.workers_var = tk.IntVar(value=1)
+        spin_workers = ttk.Spinbox(row3, from_=1, to=os.cpu_count() or 1, textvariable=self.workers_var, width=5)
+        spin_workers.pack(side="right")
+        
+        # Background codec: PNG stays lossless, the quality applies to JPEG and WebP
+        row4 = ttk.Frame(card_settings, style="Card.TFrame")
+        row4.pack(fill="x", pady=2)
+        ttk.Label(row4, text="Background Format:", background=self.colors["bg_sec"]).pack(side="left")
+        self.format_var = tk.StringVar(value=GUI_IMAGE_FORMAT)
+        combo_format = ttk.Combobox(row4, textvariable=self.format_var, values=("png", "jpeg", "webp"),
+                                    state="readonly", width=6)
+        combo_format.pack(side="right")
+        
+        row5 = ttk.Frame(card_settings, style="Card.TFrame")
+        row5.pack(fill="x", pady=2)
+        ttk.Label(row5, text="JPEG/WebP Quality:", background=self.colors["bg_sec"]).pack(side="left")
+        self.quality_var = tk.IntVar(value=DEFAULT_IMAGE_QUALITY)
+        spin_quality = ttk.Spinbox(row5, from_=1, to=100, textvariable=self.quality_var, width=5)
+        spin_quality.pack(side="right")
+        
         # Debug
         self.debug_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(card_settings, text="Export Debug Images", variable=self.debug_var, style="TCheckbutton").pack(anchor="w", pady=5)
         
+        # Page cache: off by default, it writes up to DEFAULT_CACHE_SIZE_MB into the user's cache dir
+        self.cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(card_settings, text=f"Reuse Cached Pages (up to {DEFAULT_CACHE_SIZE_MB // 1024} GB)",
+                        variable=self.cache_var, style="TCheckbutton").pack(anchor="w", pady=(5, 0))
+        ttk.Label(card_settings, text=DEFAULT_CACHE_DIR, background=self.colors["bg_sec"],
+                  font=("Segoe UI", 8)).pack(anchor="w", pady=(0, 5))
+        
         # --- Start Button ---
         self.btn_convert = ttk.Button(frame, text="START BATCH CONVERSION", command=self.start_batch, style="Accent.TButton", cursor="hand2")
         self.btn_convert.pack(fill="x", pady=10, ipady=5)
@@ -533,23 +4039,34 @@ class App:
         dpi = self.dpi_var.get()
         dil = self.dil_var.get()
         debug = self.debug_var.get()
+        workers = self.workers_var.get()
+        options = {
+            'cache_dir': DEFAULT_CACHE_DIR if self.cache_var.get() else None,
+            'image_format': self.format_var.get(),
+            'image_quality': self.quality_var.get(),
+        }
         
         files_to_process = list(self.file_queue)
         
-        t = threading.Thread(target=self.run_batch, args=(files_to_process, dpi, dil, debug))
+        t = threading.Thread(target=self.run_batch, args=(files_to_process, dpi, dil, debug, workers, options))
         t.daemon = True
         t.start()
 
-    def run_batch(self, files, dpi, dil, debug):
+    def run_batch(self, files, dpi, dil, debug, workers=1, options=None):
         total = len(files)
         success_count = 0
         
         self.log_thread_safe(f"--- STARTING BATCH: {total} FILES ---")
         
-        converter = ConverterLogic(log_callback=self.log_thread_safe)
+        if workers > 1 and total > 1:
+            self.run_batch_parallel(files, dpi, dil, debug, workers, options)
+            return
+        
+        converter = ConverterLogic(log_callback=self.log_thread_safe, **(options or {}))
         
-        self.log_thread_safe("Initializing AI Models...")
-        if not converter.initialize_models():
+        if not self.warm_converter._initialized:
+            self.log_thread_safe("Waiting for AI models to finish loading...")
+        if not converter.load_models_from(self.warm_converter):
             self.log_thread_safe("CRITICAL: Failed to init models.")
             self.reset_ui()
             return
@@ -572,6 +4089,31 @@ class App:
         self.log_thread_safe(f"--- COMPLETED: {success_count}/{total} SUCCEEDED ---")
         self.reset_ui()
 
+    def run_batch_parallel(self, files, dpi, dil, debug, workers, options=None):
+        total = len(files)
+        done = []
+        
+        def on_result(pdf_path, ok):
+            done.append(ok)
+            status = "OK" if ok else "FAILED"
+            self.log_thread_safe(f"[{len(done)}/{total}] {status}: {os.path.basename(pdf_path)}")
+        
+        def on_progress(worker_id, event):
+            if event['event'] == 'page_done':
+                self.log_thread_safe(f"[W{worker_id}] {os.path.basename(event['file'])}: page {event['page']}/{event['total_pages']}")
+        
+        executor = BatchExecutor(workers, log_callback=self.log_thread_safe,
+                                 progress_callback=on_progress, result_callback=on_result,
+                                 converter_options=options)
+        jobs = [(pdf_path, f"{os.path.splitext(pdf_path)[0]}_Editable.pptx") for pdf_path in files]
+        try:
+            results = executor.run(jobs, dpi, dil, debug)
+        finally:
+            executor.close()
+        
+        self.log_thread_safe(f"--- COMPLETED: {sum(results)}/{total} SUCCEEDED ---")
+        self.reset_ui()
+
     def reset_ui(self):
         self.root.after(0, lambda: self.btn_convert.config(state="normal", text="START BATCH CONVERSION"))
 
@@ -579,17 +4121,14 @@ class App:
         self.root.after(0, lambda: self.log(msg))
 
 if __name__ == "__main__":
+    # Required for the batch worker processes in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     # If args provided, run headless
-    if len(sys.argv) > 1:
-        pdf_file = sys.argv[1]
-        pptx_file = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(pdf_file)[0] + "_Editable.pptx"
-        dpi = int(sys.argv[3]) if len(sys.argv) > 3 else 100
-        dilation = int(sys.argv[4]) if len(sys.argv) > 4 else 15
-        
-        logic = ConverterLogic()
-        if os.path.exists(pdf_file):
-            print(f"CLI Mode: DPI={dpi}, Dilation={dilation}")
-            logic.convert(pdf_file, pptx_file, dpi, dilation)
+    if len(sys.argv) > 1 or not HAS_TK:
+        if len(sys.argv) == 1:
+            build_arg_parser().print_help()
+            sys.exit(EXIT_USAGE)
+        sys.exit(main())
     else:
         # GUI Mode
         if HAS_DND:
@@ -0,0 +1,66 @@
+"""Job checkpoints: saving finished pages and resuming them"""
+import os
+
+import pytest
+
+import pdf2pptx_converter as converter
+
+
+def finished_job(index, payload=b"encoded page"):
+    job = converter.PageJob(index, 720, 405)
+    job.encoded, job.encoded_ext = payload, "jpg"
+    job.text_blocks = [{'text': f"page {index + 1}", 'left': 1.0, 'top': 2.0}]
+    return job
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "deck.pdf"
+    path.write_bytes(b"%PDF-1.4 not really a PDF, only hashed")
+    return str(path)
+
+
+def test_checkpoint_save_and_load(tmp_path, pdf_path):
+    settings = {'dpi': 100, 'dilation_size': 15}
+    checkpoint = converter.JobCheckpoint(str(tmp_path / "jobs"), pdf_path, settings)
+    assert checkpoint.finished() == set()
+    checkpoint.save(finished_job(0))
+    checkpoint.save(finished_job(2, b"third"))
+
+    resumed = converter.JobCheckpoint(str(tmp_path / "jobs"), pdf_path, settings)
+    assert resumed.path == checkpoint.path
+    assert resumed.finished() == {0, 2}
+    job = resumed.load(2)
+    assert job.restored and job.index == 2
+    assert (job.encoded, job.encoded_ext) == (b"third", "jpg")
+    assert job.text_blocks == [{'text': "page 3", 'left': 1.0, 'top': 2.0}]
+    assert (job.width_pt, job.height_pt) == (720, 405)
+    assert resumed.load(1) is None
+
+
+def test_checkpoint_changes_with_settings_and_input(tmp_path, pdf_path):
+    root = str(tmp_path / "jobs")
+    checkpoint = converter.JobCheckpoint(root, pdf_path, {'dpi': 100})
+    checkpoint.save(finished_job(0))
+    assert converter.JobCheckpoint(root, pdf_path, {'dpi': 150}).finished() == set()
+    with open(pdf_path, "ab") as f:
+        f.write(b" edited")
+    assert converter.JobCheckpoint(root, pdf_path, {'dpi': 100}).finished() == set()
+
+
+def test_checkpoint_ignores_pages_without_their_json(tmp_path, pdf_path):
+    checkpoint = converter.JobCheckpoint(str(tmp_path / "jobs"), pdf_path, {})
+    with open(os.path.join(checkpoint.path, "page_00004.jpg"), "wb") as f:
+        f.write(b"interrupted before the JSON was written")
+    assert checkpoint.finished() == set()
+
+
+def test_checkpoint_settings_identify_the_models():
+    logic = converter.ConverterLogic(log_callback=lambda msg: None, inpaint_backend='onnx',
+                                     onnx_model="missing.onnx")
+    settings = logic.checkpoint_settings(100, 15)
+    assert settings['models'].endswith("|onnx-lama-unknown")
+    int8 = converter.ConverterLogic(log_callback=lambda msg: None, inpaint_backend='onnx',
+                                    onnx_model="missing.onnx", inpaint_precision='int8')
+    assert int8.checkpoint_settings(100, 15)['models'] != settings['models']
+    assert 'cores' not in settings and 'job_dir' not in settings
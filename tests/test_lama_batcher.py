@@ -0,0 +1,85 @@
+"""LamaBatcher: grouping LaMa crops of several pages by padded size"""
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import pdf2pptx_converter as converter
+
+
+class RecordingInpainter:
+    """Returns the padded crops unchanged and records the batch shapes"""
+    def __init__(self):
+        self.shapes = []
+        self.lock = threading.Lock()
+
+    def batch(self, images, masks):
+        assert images.shape[:3] == masks.shape
+        with self.lock:
+            self.shapes.append(images.shape)
+        return images
+
+
+def crop(width, height, seed):
+    pixels = np.random.default_rng(seed).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels), Image.fromarray(np.full((height, width), 255, np.uint8))
+
+
+def test_batcher_groups_crops_by_padded_size():
+    inpainter = RecordingInpainter()
+    batcher = converter.LamaBatcher(inpainter, batch_size=2, max_wait_ms=60_000)
+    try:
+        crops = [crop(100, 60, 0), crop(200, 60, 1), crop(120, 50, 2)]
+        futures = [batcher.submit(image, mask) for image, mask in crops]
+        # 100x60 and 120x50 share the 128x64 bucket, which is now full
+        assert futures[0].result(timeout=10) is not None
+        assert not futures[1].done()
+        batcher.flush()
+        results = [future.result(timeout=10) for future in futures]
+    finally:
+        batcher.close()
+    assert sorted(inpainter.shapes) == [(1, 64, 256, 3), (2, 64, 128, 3)]
+    assert (batcher.batches, batcher.items) == (2, 3)
+    for (image, _mask), result in zip(crops, results):
+        assert result.size == image.size
+        assert np.array_equal(np.asarray(result), np.asarray(image))
+
+
+def test_batcher_splits_full_buckets():
+    inpainter = RecordingInpainter()
+    batcher = converter.LamaBatcher(inpainter, batch_size=2, max_wait_ms=60_000)
+    futures = [batcher.submit(*crop(64, 64, seed)) for seed in range(5)]
+    batcher.close()
+    assert all(future.result(timeout=10).size == (64, 64) for future in futures)
+    assert [shape[0] for shape in inpainter.shapes] == [2, 2, 1]
+
+
+def test_batcher_runs_a_lone_crop_after_the_wait():
+    batcher = converter.LamaBatcher(RecordingInpainter(), batch_size=8, max_wait_ms=20)
+    try:
+        assert batcher.submit(*crop(30, 30, 0)).result(timeout=10).size == (30, 30)
+    finally:
+        batcher.close()
+
+
+def test_batcher_passes_inpainter_errors_to_every_crop():
+    class Failing:
+        def batch(self, images, masks):
+            raise RuntimeError("out of memory")
+    batcher = converter.LamaBatcher(Failing(), batch_size=2, max_wait_ms=60_000)
+    futures = [batcher.submit(*crop(40, 40, seed)) for seed in range(2)]
+    batcher.close()
+    for future in futures:
+        with pytest.raises(RuntimeError, match="out of memory"):
+            future.result(timeout=10)
+    assert batcher.batches == 0
+
+
+def test_batcher_close_discards_queued_crops():
+    batcher = converter.LamaBatcher(RecordingInpainter(), batch_size=4, max_wait_ms=60_000)
+    future = batcher.submit(*crop(40, 40, 0))
+    batcher.close(discard=True)
+    assert future.cancelled()
+    with pytest.raises(RuntimeError):
+        batcher.submit(*crop(40, 40, 1))
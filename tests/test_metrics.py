@@ -0,0 +1,20 @@
+"""Conversion metrics: merging the pages measured by page workers"""
+import pdf2pptx_converter as converter
+
+
+def test_merge_adds_worker_pages_to_the_file_summary():
+    metrics = converter.ConversionMetrics("deck.pdf", 100)
+    metrics.page(1, restored=True)
+    metrics.stage(1, 'write', 0.01, 0.01)
+    shard = converter.ConversionMetrics("deck.pdf", 100)
+    for page in (2, 3):
+        shard.stage(page, 'ocr', 0.5, 0.4)
+        shard.page(page, ocr_boxes=7, mask_coverage_pct=2.0)
+    metrics.merge(shard.stage_rows, list(shard.pages.values()), page_worker=1)
+
+    summary = metrics.summary()
+    assert summary['pages'] == 3
+    assert summary['ocr_boxes'] == 14
+    assert summary['stages']['ocr']['count'] == 2 and summary['stages']['ocr']['p50_s'] == 0.5
+    assert [p.get('page_worker') for p in summary['page_details']] == [None, 1, 1]
+    assert summary['page_details'][0]['restored']
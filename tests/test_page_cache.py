@@ -0,0 +1,52 @@
+"""On-disk page cache: keys, round trip and LRU eviction"""
+import os
+
+import numpy as np
+from PIL import Image
+
+import pdf2pptx_converter as converter
+
+
+def quad(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+def noise_image(seed, size=64):
+    return Image.fromarray(np.random.default_rng(seed).integers(0, 255, (size, size, 3), dtype=np.uint8))
+
+
+def test_page_cache_roundtrip(tmp_path):
+    cache = converter.PageCache(str(tmp_path))
+    image = noise_image(0)
+    key = cache.make_key(image, 100, 15)
+    assert cache.get(key) is None
+    cache.put(key, [(quad(1, 2, 3, 4), "text", 0.5)], image)
+    boxes, background = cache.get(key)
+    assert boxes == [[quad(1.0, 2.0, 3.0, 4.0), "text", 0.5]]
+    assert np.array_equal(np.asarray(background), np.asarray(image))
+
+
+def test_page_cache_key_covers_settings_and_stripped_render(tmp_path):
+    cache = converter.PageCache(str(tmp_path))
+    image, stripped = noise_image(0), noise_image(1)
+    key = cache.make_key(image, 100, 15)
+    assert key == cache.make_key(np.asarray(image), 100, 15)
+    assert key != cache.make_key(image, 100, 16)
+    assert key != cache.make_key(image, 100, 15, stripped=stripped)
+
+
+def test_page_cache_evicts_least_recently_used(tmp_path):
+    cache = converter.PageCache(str(tmp_path))
+    cache.put("a", [], noise_image(0))
+    entry = cache.size
+    cache.max_bytes = int(entry * 2.5)
+    cache.put("b", [], noise_image(1))
+    # "a" is the older entry, until a hit makes it the most recent one
+    for n, key in enumerate(("a", "b")):
+        for path in cache._paths(key):
+            os.utime(path, (1000 + n, 1000 + n))
+    assert cache.get("a") is not None
+    cache.put("c", [], noise_image(2))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size <= cache.max_bytes
@@ -0,0 +1,17 @@
+"""Regions of interest: merging overlapping mask boxes"""
+import pdf2pptx_converter as converter
+
+
+def test_merge_boxes_joins_overlapping_chains():
+    boxes = [(0, 0, 10, 10), (5, 5, 20, 20), (18, 0, 30, 8), (100, 100, 110, 110)]
+    merged = sorted(map(tuple, converter.merge_boxes(boxes)))
+    assert merged == [(0, 0, 30, 20), (100, 100, 110, 110)]
+
+
+def test_merge_boxes_keeps_touching_boxes_apart():
+    merged = sorted(map(tuple, converter.merge_boxes([(0, 0, 10, 10), (10, 0, 20, 10)])))
+    assert merged == [(0, 0, 10, 10), (10, 0, 20, 10)]
+
+
+def test_merge_boxes_empty():
+    assert list(converter.merge_boxes([])) == []
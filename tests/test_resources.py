@@ -0,0 +1,30 @@
+"""CPU sets of the page workers"""
+import pytest
+
+import pdf2pptx_converter as converter
+
+
+@pytest.fixture
+def eight_cpus(monkeypatch):
+    monkeypatch.setattr(converter, "available_cores", lambda: list(range(8)))
+
+
+def test_worker_cpu_sets_split_every_cpu(eight_cpus):
+    assert converter.worker_cpu_sets(4, 0) == [[0, 1], [2, 3], [4, 5], [6, 7]]
+    assert converter.worker_cpu_sets(3, 0) == [[0, 1, 2], [3, 4], [5, 6, 7]]
+
+
+def test_worker_cpu_sets_limit_to_cores(eight_cpus):
+    assert converter.worker_cpu_sets(2, 4) == [[0, 1], [2, 3]]
+
+
+def test_worker_cpu_sets_share_cpus_round_robin(eight_cpus):
+    assert converter.worker_cpu_sets(3, 2) == [[0], [1], [0]]
+
+
+def test_worker_cpu_sets_off_without_cores(eight_cpus):
+    assert converter.worker_cpu_sets(3) == [None, None, None]
+
+
+def test_format_cpu_set():
+    assert converter.format_cpu_set([3, 0, 1, 2, 8, 10, 11]) == "0-3,8,10-11"
@@ -0,0 +1,48 @@
+"""Text mask: per-line dilation, bucketed by kernel size"""
+import numpy as np
+import pytest
+
+import pdf2pptx_converter as converter
+
+
+def quad(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+@pytest.fixture
+def logic():
+    return converter.ConverterLogic(log_callback=lambda msg: None)
+
+
+def mask_reach(mask, row, col0):
+    """How far the mask extends to the left of column col0 on a row"""
+    return col0 - int(np.flatnonzero(mask[row])[0])
+
+
+def test_text_mask_dilation_follows_each_line_height(logic):
+    small = (quad(100, 100, 400, 110), "small", 0.9)
+    large = (quad(100, 300, 700, 360), "large", 0.9)
+    mask = logic.build_text_mask((500, 800), [small, large], 15)
+    # Expanded by 10% around the center, then dilated by a kernel growing with the line height
+    assert mask_reach(mask, 105, 85) < mask_reach(mask, 330, 70)
+
+
+def test_text_mask_buckets_match_lines_masked_one_by_one(logic):
+    lines = [(quad(50, 40 + 80 * n, 600, 40 + 80 * n + h), "line", 0.9) for n, h in enumerate((8, 14, 22, 40, 60))]
+    mask = logic.build_text_mask((520, 700), lines, 15)
+    expected = np.zeros_like(mask)
+    for line in lines:
+        expected |= logic.build_text_mask((520, 700), [line], 15)
+    assert np.array_equal(mask, expected)
+
+
+def test_text_mask_kernels_are_clipped(logic):
+    title = [(quad(100, 100, 300, 600), "title", 0.9)]
+    widest = logic.build_text_mask((800, 800), title, 50)
+    assert mask_reach(widest, 350, 90) <= converter.MASK_MAX_KERNEL_PX // 2 + 2
+    tiny = [(quad(100, 100, 300, 104), "tiny", 0.9)]
+    assert logic.build_text_mask((300, 400), tiny, 0).any()
+
+
+def test_text_mask_empty(logic):
+    assert not logic.build_text_mask((20, 30), [], 15).any()
@@ -0,0 +1,69 @@
+"""Tiled pages: tile spans and stitching the lines read by overlapping tiles"""
+import pytest
+
+import pdf2pptx_converter as converter
+
+
+def quad(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+@pytest.mark.parametrize("length", [1, 2047, 2048, 2049, 5000, 12345])
+def test_tile_spans_cores_partition_the_range(length):
+    spans = converter.tile_spans(length)
+    assert spans[0][0] == 0 and spans[-1][1] == length
+    for (a0, a1, s0, e0), (b0, b1, s1, e1) in zip(spans, spans[1:]):
+        assert a1 == b0
+    for core0, core1, start, end in spans:
+        assert core1 - core0 <= converter.TILE_PX
+        assert start == max(0, core0 - converter.TILE_OVERLAP_PX)
+        assert end == min(length, core1 + converter.TILE_OVERLAP_PX)
+
+
+@pytest.mark.parametrize("left, right, joined", [
+    ("hello wor", "world", "hello world"),
+    ("quarterly rev", "revenue", "quarterly revenue"),
+    ("market", "strategy", "market strategy"),
+    ("縦書きの", "きの文章", "縦書きの文章"),
+    ("hello wox", "world", "hello world"),   # character misread at the tile edge
+    ("hello wor", "Xorld", "hello world"),
+])
+def test_join_overlapping_text(left, right, joined):
+    assert converter.join_overlapping_text(left, right) == joined
+
+
+LEFT_CORE, LEFT_EXTENT = (0, 0, 1000, 1000), (0, 0, 1128, 1128)
+RIGHT_CORE, RIGHT_EXTENT = (1000, 0, 2000, 1000), (872, 0, 2000, 1128)
+LOWER_CORE, LOWER_EXTENT = (0, 1000, 1000, 2000), (0, 872, 1128, 2000)
+
+
+def test_stitch_joins_a_line_cut_by_a_vertical_tile_edge():
+    items = [(quad(700, 10, 1128, 40), "hello wor", 0.9, LEFT_CORE, LEFT_EXTENT),
+             (quad(872, 10, 1400, 40), "world again", 0.8, RIGHT_CORE, RIGHT_EXTENT)]
+    [(box, text, score)] = converter.stitch_tile_lines(items)
+    assert text == "hello world again"
+    assert box == quad(700, 10, 1400, 40)
+    assert score == 0.8
+
+
+def test_stitch_joins_vertical_text_cut_by_a_horizontal_tile_edge():
+    items = [(quad(500, 700, 530, 1128), "縦書きの", 0.9, LEFT_CORE, LEFT_EXTENT),
+             (quad(500, 872, 530, 1300), "きの文章", 0.8, LOWER_CORE, LOWER_EXTENT)]
+    [(box, text, _score)] = converter.stitch_tile_lines(items)
+    assert text == "縦書きの文章"
+    assert box == quad(500, 700, 530, 1300)
+
+
+def test_stitch_keeps_a_line_read_whole_by_two_tiles_once():
+    # Inside the overlap: both tiles read it, the one whose core holds its center keeps it
+    items = [(quad(900, 10, 980, 40), "twice", 0.9, LEFT_CORE, LEFT_EXTENT),
+             (quad(900, 10, 980, 40), "twice", 0.9, RIGHT_CORE, RIGHT_EXTENT)]
+    assert [text for _box, text, _score in converter.stitch_tile_lines(items)] == ["twice"]
+
+
+def test_stitch_leaves_unrelated_lines_alone():
+    items = [(quad(10, 10, 300, 40), "first", 0.9, LEFT_CORE, LEFT_EXTENT),
+             (quad(1200, 500, 1500, 530), "second", 0.7, RIGHT_CORE, RIGHT_EXTENT)]
+    result = converter.stitch_tile_lines(items)
+    assert [(box, text) for box, text, _score in result] == [(quad(10, 10, 300, 40), "first"),
+                                                             (quad(1200, 500, 1500, 530), "second")]